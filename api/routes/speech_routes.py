@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
 from api.models.requests import SpeechToTextRequest
 from api.services.speech_service import SpeechToTextService
 from api.services.ai_service import AIService
@@ -24,6 +24,33 @@ async def transcribe_speech(request: SpeechToTextRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
 
+@router.post("/transcribe-raw")
+async def transcribe_raw_speech(request: Request, language: str = "en"):
+    """Convert raw audio bytes sent as the request body to text"""
+    audio_bytes = await request.body()
+    if not audio_bytes:
+        raise HTTPException(status_code=400, detail="Audio data is required")
+        
+    try:
+        return await speech_service.transcribe_audio_whisper_bytes(audio_bytes, language)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Transcription failed: {str(e)}")
+
+@router.websocket("/stream")
+async def stream_speech(websocket: WebSocket, language: str = "en"):
+    """Stream partial transcriptions for 16kHz mono PCM16 audio chunks"""
+    await websocket.accept()
+    try:
+        await speech_service.transcribe_stream(websocket, language)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Speech stream error: {e}")
+        try:
+            await websocket.close()
+        except:
+            pass
+
 @router.post("/process-elder-speech")
 async def process_elder_speech(request: dict):
     """Process speech from elder - transcribe and get AI response"""
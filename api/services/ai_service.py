@@ -2,11 +2,24 @@ import ollama
 import json
 import base64
 import asyncio
+import re
 from typing import Dict, List, Any, Optional
 from .device_service import DeviceService
 from .mqtt_service import MQTTService
 from .intent_database_service import IntentDatabaseService
 
+def _keyword_pattern(keywords: List[str]) -> "re.Pattern":
+    """Compile substring keywords into one precompiled alternation"""
+    return re.compile("|".join(re.escape(keyword) for keyword in keywords))
+
+# Keyword pre-filters, matched against the lowercased message
+_TEMPERATURE_KEYWORDS_RE = _keyword_pattern(['cold', 'hot', 'warm', 'temperature', 'thermostat', 'chilly', 'freezing', 'heating', 'cooling'])
+_EMERGENCY_KEYWORDS_RE = _keyword_pattern(['help', 'emergency', 'fall', 'fell', 'hurt', 'pain', 'sick', 'call 911', 'ambulance', 'chest pain', 'cannot breathe', 'dizzy'])
+_LONELINESS_KEYWORDS_RE = _keyword_pattern(['lonely', 'sad', 'depressed', 'worried', 'scared', 'anxious', 'upset', 'confused'])
+
+# Seconds the Ollama model list is reused, so health probes don't query the daemon each time
+MODEL_LIST_TTL_SECONDS = 5.0
+
 class AIService:
     def __init__(self):
         self.default_model = "gemma3:4b"
@@ -54,6 +67,14 @@ class AIService:
             "general": self._get_general_system_prompt()
         }
         
+        # Identical context-free prompts in flight share one LLM call; only the
+        # side-effect-free completion is shared, never device or alert handling
+        self._inflight_completions: Dict[tuple, asyncio.Task] = {}
+        
+        # Cached Ollama model names and when they go stale
+        self._models_cache: Optional[List[str]] = None
+        self._models_expires = 0.0
+        
     def _get_assistance_system_prompt(self) -> str:
         """System prompt for elder assistance with mental health focus"""
         return """You are a compassionate AI companion specifically designed for eldercare assistance and mental health support. Your primary goals are:
@@ -306,6 +327,22 @@ Remember you are speaking to an elderly person, so use clear, simple language an
 
     async def chat_completion(self, message: str, model: str = None, context: List[Dict] = None) -> Dict[str, Any]:
         """Generate AI response to a message"""
+        if context:
+            return await self._chat_completion(message, model, context)
+            
+        key = (model or self.default_model, message)
+        task = self._inflight_completions.get(key)
+        if task is None:
+            task = asyncio.create_task(self._chat_completion(message, model, None))
+            self._inflight_completions[key] = task
+            task.add_done_callback(lambda _: self._inflight_completions.pop(key, None))
+            
+        # Shielded so one caller disconnecting doesn't cancel the others; each
+        # caller gets its own copy of the result
+        return dict(await asyncio.shield(task))
+    
+    async def _chat_completion(self, message: str, model: str = None, context: List[Dict] = None) -> Dict[str, Any]:
+        """Ask Ollama for a reply to a message"""
         try:
             model = model or self.default_model
             
@@ -313,8 +350,10 @@ Remember you are speaking to an elderly person, so use clear, simple language an
             messages = context or []
             messages.append({'role': 'user', 'content': message})
             
-            # Get response from Ollama
-            response = ollama.chat(
+            # Get response from Ollama; the blocking call runs off the event loop
+            # so concurrent requests (and identical ones joining it) aren't stalled
+            response = await asyncio.to_thread(
+                ollama.chat,
                 model=model,
                 messages=messages
             )
@@ -444,13 +483,11 @@ Remember you are speaking to an elderly person, so use clear, simple language an
                 except asyncio.TimeoutError:
                     print("⏱️ Temperature detection timed out, using keyword fallback")
                     # Fallback to keyword detection if LLM times out
-                    temperature_keywords = ['cold', 'hot', 'warm', 'temperature', 'thermostat', 'chilly', 'freezing', 'heating', 'cooling']
-                    is_temperature_related = any(keyword in message.lower() for keyword in temperature_keywords)
+                    is_temperature_related = bool(_TEMPERATURE_KEYWORDS_RE.search(message_lower))
                 except Exception as e:
                     print(f"❌ Temperature detection failed: {e}, using keyword fallback")
                     # Fallback to keyword detection if LLM fails
-                    temperature_keywords = ['cold', 'hot', 'warm', 'temperature', 'thermostat', 'chilly', 'freezing', 'heating', 'cooling']
-                    is_temperature_related = any(keyword in message.lower() for keyword in temperature_keywords)
+                    is_temperature_related = bool(_TEMPERATURE_KEYWORDS_RE.search(message_lower))
                 
                 print(f"Intent: {intent_name}, LLM detected temperature-related: {is_temperature_related}")  # Debug
                 
@@ -513,8 +550,7 @@ Remember you are speaking to an elderly person, so use clear, simple language an
                 except (asyncio.TimeoutError, Exception):
                     print("⏱️ Temperature detection timed out (no intent), using keyword fallback")
                     # Fallback to keyword detection if LLM times out or fails
-                    temperature_keywords = ['cold', 'hot', 'warm', 'temperature', 'thermostat', 'chilly', 'freezing', 'heating', 'cooling']
-                    is_temperature_related = any(keyword in message.lower() for keyword in temperature_keywords)
+                    is_temperature_related = bool(_TEMPERATURE_KEYWORDS_RE.search(message_lower))
                 
                 print(f"No database intent, but LLM detected temperature-related: {is_temperature_related}")  # Debug
                 
@@ -594,7 +630,7 @@ Remember you are speaking to an elderly person, so use clear, simple language an
                             "reasoning": f"Elder wants to control {device['name']} but action unclear"
                         }
                 # Check for emergency keywords
-                elif any(keyword in message_lower for keyword in ['help', 'emergency', 'fall', 'fell', 'hurt', 'pain', 'sick', 'call 911', 'ambulance', 'chest pain', 'cannot breathe', 'dizzy']):
+                elif _EMERGENCY_KEYWORDS_RE.search(message_lower):
                     print(f"Emergency detected")
                     analysis_data = {
                         "intent": "emergency",
@@ -605,7 +641,7 @@ Remember you are speaking to an elderly person, so use clear, simple language an
                         "reasoning": "Emergency situation detected"
                     }
                 # Check for loneliness/health concern keywords
-                elif any(keyword in message_lower for keyword in ['lonely', 'sad', 'depressed', 'worried', 'scared', 'anxious', 'upset', 'confused']):
+                elif _LONELINESS_KEYWORDS_RE.search(message_lower):
                     print(f"Mental health concern detected")
                     analysis_data = {
                         "intent": "loneliness",
@@ -679,9 +715,14 @@ Remember you are speaking to an elderly person, so use clear, simple language an
             
     async def list_available_models(self) -> List[str]:
         """Get list of available Ollama models"""
+        loop = asyncio.get_running_loop()
+        if self._models_cache is not None and loop.time() < self._models_expires:
+            return self._models_cache
         try:
-            models = ollama.list()
-            return [model['name'] for model in models['models']]
+            models = await asyncio.to_thread(ollama.list)
+            self._models_cache = [model['name'] for model in models['models']]
+            self._models_expires = loop.time() + MODEL_LIST_TTL_SECONDS
+            return self._models_cache
         except Exception as e:
             print(f"Error listing models: {e}")
             return [self.default_model]
@@ -966,8 +1007,7 @@ Remember you are speaking to an elderly person, so use clear, simple language an
         except Exception as e:
             print(f"Temperature detection error: {e}")
             # Fallback to basic keyword check if LLM fails
-            temperature_keywords = ['cold', 'hot', 'warm', 'temperature', 'thermostat', 'chilly', 'freezing', 'heating', 'cooling']
-            return any(keyword in message.lower() for keyword in temperature_keywords)
+            return bool(_TEMPERATURE_KEYWORDS_RE.search(message.lower()))
 
     async def _enhanced_temperature_reasoning(self, message: str, elder_info: Dict = None) -> Dict[str, Any]:
         """Simple temperature reasoning based on current reading and request sentiment"""
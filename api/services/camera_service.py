@@ -316,7 +316,7 @@ class CameraService:
                 
                 # Every 15 seconds (225 frames at 15fps), trigger VLM analysis
                 if frame_count > 0 and frame_count % 225 == 0:
-                    self._trigger_vlm_analysis(camera_id, frame_base64, frame_count)
+                    self._trigger_vlm_analysis(camera_id, memoryview(buffer), frame_count)
                 
                 frame_count += 1
                 time.sleep(1/15)  # ~15 FPS for video samples
@@ -417,7 +417,7 @@ class CameraService:
                     
                     # Every 15 seconds (225 frames at 15fps), trigger VLM analysis
                     if frame_count > 0 and frame_count % 225 == 0:
-                        self._trigger_vlm_analysis(camera_id, frame_base64, frame_count)
+                        self._trigger_vlm_analysis(camera_id, memoryview(buffer), frame_count)
                     
                     frame_count += 1
                     
@@ -638,7 +638,7 @@ class CameraService:
         
         return frame
     
-    def _trigger_vlm_analysis(self, camera_id: int, frame_base64: str, frame_count: int):
+    def _trigger_vlm_analysis(self, camera_id: int, frame_jpeg: memoryview, frame_count: int):
         """Trigger VLM analysis for 15-second clips"""
         try:
             print(f"Triggering VLM analysis for camera {camera_id} at frame {frame_count}")
@@ -646,9 +646,10 @@ class CameraService:
             # Import VLM service
             from api.services.vlm_service import vlm_service
             
-            # Add current frame to VLM buffer
+            # Add current frame to VLM buffer as the encoded JPEG itself, not the
+            # base64 text the VLM service would only decode again
             timestamp = datetime.now().isoformat()
-            vlm_service.add_frame_to_buffer(camera_id, frame_base64, timestamp)
+            vlm_service.add_frame_to_buffer(camera_id, frame_jpeg, timestamp)
             
             # Queue analysis for processing
             vlm_service.queue_analysis(camera_id, elder_id=1)  # Default elder_id
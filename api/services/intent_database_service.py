@@ -6,11 +6,18 @@ Handles database operations for AI intent detection and action parameter retriev
 import sqlite3
 import os
 import json
+import time
 from typing import Dict, List, Any, Optional
 
+# Intents and keywords are edited by the scripts in api/database from another
+# process, so the in-memory keyword cache is reloaded after this many seconds
+KEYWORD_CACHE_TTL_SECONDS = 30.0
+
 class IntentDatabaseService:
     def __init__(self):
         self.db_path = os.path.join(os.path.dirname(__file__), '../database/eldercare_intents.db')
+        self._keyword_cache: Optional[List[tuple]] = None
+        self._keyword_cache_expires = 0.0
         
     def _get_connection(self):
         """Get database connection"""
@@ -20,42 +27,61 @@ class IntentDatabaseService:
             init_intent_actions_database()
         return sqlite3.connect(self.db_path)
     
-    def detect_intent_from_keywords(self, message: str, confidence_threshold: float = 0.7) -> Optional[Dict[str, Any]]:
+    def warm_keyword_cache(self) -> List[tuple]:
         """
-        Detect intent from message using keyword matching with weights
+        Load all active intent keywords into memory
+        
+        Rows are kept as plain tuples (default row factory) and read in
+        fetchmany batches; keywords are stored lowercased for matching.
         
-        Args:
-            message: User's message
-            confidence_threshold: Minimum confidence required
-            
         Returns:
-            Intent information with confidence score
+            List of (intent_id, intent_name, description, category,
+            threshold, keyword, weight) tuples ordered by weight
         """
-        message_lower = message.lower()
-        
         conn = self._get_connection()
         cursor = conn.cursor()
         
-        # Get all active intents with their keywords
         cursor.execute('''
             SELECT i.id, i.intent_name, i.description, i.category, i.confidence_threshold,
-                   ik.keyword, ik.weight, ik.context
+                   ik.keyword, ik.weight
             FROM intents i
             JOIN intent_keywords ik ON i.id = ik.intent_id
             WHERE i.is_active = 1
             ORDER BY ik.weight DESC
         ''')
         
-        results = cursor.fetchall()
+        keyword_rows = []
+        while rows := cursor.fetchmany(2000):
+            for intent_id, intent_name, description, category, threshold, keyword, weight in rows:
+                keyword_rows.append((intent_id, intent_name, description, category, threshold, keyword.lower(), weight))
         conn.close()
         
+        self._keyword_cache = keyword_rows
+        self._keyword_cache_expires = time.monotonic() + KEYWORD_CACHE_TTL_SECONDS
+        return keyword_rows
+    
+    def detect_intent_from_keywords(self, message: str, confidence_threshold: float = 0.7) -> Optional[Dict[str, Any]]:
+        """
+        Detect intent from message using keyword matching with weights
+        
+        Args:
+            message: User's message
+            confidence_threshold: Minimum confidence required
+            
+        Returns:
+            Intent information with confidence score
+        """
+        message_lower = message.lower()
+        
+        keyword_rows = self._keyword_cache
+        if keyword_rows is None or time.monotonic() >= self._keyword_cache_expires:
+            keyword_rows = self.warm_keyword_cache()
+        
         # Calculate intent scores
         intent_scores = {}
         intent_info = {}
         
-        for row in results:
-            intent_id, intent_name, description, category, threshold, keyword, weight, context = row
-            
+        for intent_id, intent_name, description, category, threshold, keyword, weight in keyword_rows:
             # Store intent info
             if intent_name not in intent_info:
                 intent_info[intent_name] = {
@@ -67,7 +93,7 @@ class IntentDatabaseService:
                 }
             
             # Check if keyword matches
-            if keyword.lower() in message_lower:
+            if keyword in message_lower:
                 if intent_name not in intent_scores:
                     intent_scores[intent_name] = 0
                 intent_scores[intent_name] += weight
@@ -3,13 +3,89 @@ import json
 import asyncio
 from typing import Optional, Callable
 import threading
+import os
+import socket
+
+# Seconds between keepalive checks, and between reconnect attempts while the broker is down
+MQTT_MISC_INTERVAL = 1.0
+MQTT_RECONNECT_DELAY = 5.0
+
+def _run_in_loop(loop: asyncio.AbstractEventLoop, callback, *args):
+    """Run a socket (un)registration on the event loop thread"""
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        callback(*args)
+    else:
+        # The socket is opened by connect() in a worker thread
+        loop.call_soon_threadsafe(callback, *args)
+
+def _loop_watches_sockets(loop: asyncio.AbstractEventLoop) -> bool:
+    """Whether the loop supports add_reader/add_writer (Windows' default Proactor loop doesn't)"""
+    probe, peer = socket.socketpair()
+    try:
+        loop.add_reader(probe, lambda: None)
+        loop.remove_reader(probe)
+        return True
+    except NotImplementedError:
+        return False
+    finally:
+        probe.close()
+        peer.close()
+
+def start_client_on_loop(client: mqtt.Client, loop: asyncio.AbstractEventLoop,
+                         broker: str, port: int) -> Optional[asyncio.Task]:
+    """Connect a paho client whose on_connect/on_message callbacks run on the event loop
+    
+    Returns the network task driving the client, or None when the loop can't watch
+    sockets and the client runs on a loop_start() thread instead.
+    """
+    if _loop_watches_sockets(loop):
+        attach_client_to_loop(client, loop)
+        return loop.create_task(run_network_loop(client, broker, port))
+        
+    # Fall back to paho's network thread, handing each callback over to the loop
+    print("Event loop can't watch sockets, running MQTT on a network thread")
+    for name in ("on_connect", "on_message"):
+        callback = getattr(client, name)
+        if callback:
+            setattr(client, name, lambda *args, callback=callback: loop.call_soon_threadsafe(callback, *args))
+    client.connect_async(broker, port, 60)
+    client.loop_start()
+    return None
+
+def attach_client_to_loop(client: mqtt.Client, loop: asyncio.AbstractEventLoop):
+    """Drive a paho client's socket from the event loop rather than a loop_start()
+    thread, so callbacks run on the loop without GIL handoffs"""
+    client.on_socket_open = lambda c, userdata, sock: _run_in_loop(loop, loop.add_reader, sock, c.loop_read)
+    client.on_socket_close = lambda c, userdata, sock: _run_in_loop(loop, loop.remove_reader, sock)
+    client.on_socket_register_write = lambda c, userdata, sock: _run_in_loop(loop, loop.add_writer, sock, c.loop_write)
+    client.on_socket_unregister_write = lambda c, userdata, sock: _run_in_loop(loop, loop.remove_writer, sock)
+
+async def run_network_loop(client: mqtt.Client, broker: str, port: int):
+    """Connect to the broker, keep the session alive and reconnect when it drops"""
+    while True:
+        if client.loop_misc() == mqtt.MQTT_ERR_NO_CONN:
+            try:
+                # The TCP connect blocks, so it runs off the event loop
+                await asyncio.to_thread(client.connect, broker, port, 60)
+            except Exception as e:
+                print(f"MQTT connection to {broker}:{port} failed: {e}")
+                await asyncio.sleep(MQTT_RECONNECT_DELAY)
+                continue
+        await asyncio.sleep(MQTT_MISC_INTERVAL)
 
 class MQTTService:
-    def __init__(self, broker: str = "127.0.0.1", port: int = 1883):
+    def __init__(self, broker: str = os.environ.get("MQTT_BROKER", "127.0.0.1"), port: int = 1883):
         self.broker = broker
         self.port = port
         self.client: Optional[mqtt.Client] = None
         self.message_callbacks = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._network_task: Optional[asyncio.Task] = None
+        self._state_lock = threading.Lock()
         # Store current smart home state
         self.current_state = {
             "sensors": {
@@ -85,9 +161,11 @@ class MQTTService:
                     temperature = float(temp_str.strip())
                     humidity = float(humid_str.strip())
                     
-                    self.current_state["sensors"]["temperature"] = temperature
-                    self.current_state["sensors"]["humidity"] = humidity
-                    self.current_state["sensors"]["last_update"] = datetime.datetime.now().isoformat()
+                    self._update_state("sensors", {
+                        "temperature": temperature,
+                        "humidity": humidity,
+                        "last_update": datetime.datetime.now().isoformat()
+                    })
                     
                 else:
                     print(f"[ERROR] Invalid DHT11 format: {message} (no comma found)")
@@ -96,16 +174,20 @@ class MQTTService:
                 # Handle multi-room LED status updates from Arduino
                 room = topic.split("/")[1]  # Extract room name
                 if message in ["ON", "OFF", "OFFLINE"]:
-                    self.current_state["devices"][f"{room}_led"] = message
-                    self.current_state["devices"]["last_command"] = datetime.datetime.now().isoformat()
+                    self._update_state("devices", {
+                        f"{room}_led": message,
+                        "last_command": datetime.datetime.now().isoformat()
+                    })
                     print(f"[SUCCESS] {room} LED status updated: {message}")
                     
             elif topic.startswith("home/") and topic.endswith("/lights/cmd"):
                 # Track LED commands we send (echo from Arduino)
                 room = topic.split("/")[1]  # Extract room name
                 if message in ["ON", "OFF"]:
-                    self.current_state["devices"][f"{room}_led"] = message
-                    self.current_state["devices"]["last_command"] = datetime.datetime.now().isoformat()
+                    self._update_state("devices", {
+                        f"{room}_led": message,
+                        "last_command": datetime.datetime.now().isoformat()
+                    })
                     print(f"[ECHO] {room} LED command confirmed: {message}")
                     
             elif topic == "home/room/data":
@@ -114,12 +196,14 @@ class MQTTService:
                     if ',' in message:
                         temp_str, humid_str = message.split(',')
                         temp = float(temp_str.strip())
-                        self.current_state["devices"]["thermostat_target"] = temp
-                        self.current_state["devices"]["last_command"] = datetime.datetime.now().isoformat()
+                        self._update_state("devices", {
+                            "thermostat_target": temp,
+                            "last_command": datetime.datetime.now().isoformat()
+                        })
                         print(f"[SUCCESS] Thermostat target updated: {temp}°C")
                     else:
                         temp = float(message.strip())
-                        self.current_state["devices"]["thermostat_target"] = temp
+                        self._update_state("devices", {"thermostat_target": temp})
                         print(f"[SUCCESS] Thermostat target updated: {temp}°C")
                 except ValueError as e:
                     print(f"[ERROR] Invalid thermostat data: {message} - {e}")
@@ -127,26 +211,38 @@ class MQTTService:
             elif topic.startswith("home/") and topic.endswith("/status"):
                 # Handle other device status updates (generic fallback)
                 device = topic.split("/")[1]
-                self.current_state["devices"][f"{device}_status"] = message
+                self._update_state("devices", {f"{device}_status": message})
                 print(f"Device {device} status: {message}")
                 
         except Exception as e:
             print(f"Error processing Arduino message {topic}: {e}")
     
+    def _update_state(self, section: str, updates: dict):
+        """Publish a new state snapshot with updates applied to one section
+        
+        Snapshots are never mutated in place, so readers holding a previous
+        state see a consistent view without copying.
+        """
+        with self._state_lock:
+            new_section = {**self.current_state[section], **updates}
+            self.current_state = {**self.current_state, section: new_section}
+    
     def get_current_state(self):
-        """Get current smart home state"""
-        return self.current_state.copy()
+        """Get a copy of the current smart home state, safe for callers to modify"""
+        # Both levels are copied so edits to the result never reach the shared
+        # state; the state is a few small dicts, so this is cheap
+        return {section: dict(values) for section, values in self.current_state.items()}
             
     async def initialize(self):
         """Initialize MQTT client"""
         try:
+            self._loop = asyncio.get_running_loop()
             self.client = mqtt.Client()
             self.client.on_connect = self.on_connect
             self.client.on_message = self.on_message
             
-            # Connect to broker
-            self.client.connect_async(self.broker, self.port, 60)
-            self.client.loop_start()
+            # Connect to broker in the background; callbacks run on the event loop
+            self._network_task = start_client_on_loop(self.client, self._loop, self.broker, self.port)
             print("MQTT client initialized")
             
         except Exception as e:
@@ -165,13 +261,13 @@ class MQTTService:
             
             # Simulate successful Arduino commands for demo purposes
             if topic == "home/led/cmd" and message in ["ON", "OFF"]:
-                self.current_state["devices"]["led"] = message
+                self._update_state("devices", {"led": message})
                 print(f"[SIMULATED] LED set to {message}")
                 return True
             elif topic == "home/thermostat/cmd" and message.startswith("SET_TEMP:"):
                 try:
                     temp = float(message.split(":")[1])
-                    self.current_state["devices"]["thermostat_target"] = temp
+                    self._update_state("devices", {"thermostat_target": temp})
                     print(f"[SIMULATED] Thermostat set to {temp}°C")
                     return True
                 except:
@@ -190,6 +286,9 @@ class MQTTService:
             
     def disconnect(self):
         """Disconnect from MQTT broker"""
+        if self._network_task:
+            self._network_task.cancel()
+            self._network_task = None
         if self.client:
-            self.client.loop_stop()
-            self.client.disconnect()
\ No newline at end of file
+            self.client.disconnect()
+            self.client.loop_stop()  # No-op unless running on the fallback network thread
\ No newline at end of file
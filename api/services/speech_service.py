@@ -1,33 +1,92 @@
-import base64
-import tempfile
+import asyncio
+import multiprocessing
 import os
-from typing import Dict, Any
+import shutil
+import struct
+import time
+from importlib.util import find_spec
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, ClassVar, List, Optional
+import numpy as np
 import speech_recognition as sr
 from io import BytesIO
 
-# Audio format conversion
+__all__ = ["SpeechToTextService"]
+
+# SIMD base64 decoder with stdlib fallback
+try:
+    from pybase64 import b64decode_as_bytearray
+except ImportError:
+    from base64 import b64decode
+    
+    def b64decode_as_bytearray(s, validate: bool = False) -> bytearray:
+        """Stdlib stand-in for pybase64.b64decode_as_bytearray"""
+        return bytearray(b64decode(s, validate=validate))
+
+# Fast SIMD content hash for the transcription cache, with stdlib fallback
 try:
-    from pydub import AudioSegment
-    PYDUB_AVAILABLE = True
+    from blake3 import blake3 as _content_hasher
 except ImportError:
-    PYDUB_AVAILABLE = False
-    AudioSegment = None
+    from hashlib import blake2b as _content_hasher
+
+def _content_hash(data: bytes) -> bytes:
+    """Hash audio bytes for transcription cache keys"""
+    return _content_hasher(data).digest()
+
+TRANSCRIPTION_CACHE_SIZE = 256
+
+# Unpadded base64 is decoded this many characters (a multiple of 4) at a time,
+# so re-padding never copies the whole payload
+BASE64_CHUNK_CHARS = 1 << 20
 
-# Optional whisper import with error handling
+# Whisper backends pull in torch/CTranslate2, so they are only imported
+# when the model is loaded; at import time just check they are installed
+WHISPER_AVAILABLE = find_spec("whisper") is not None
+FASTER_WHISPER_AVAILABLE = find_spec("faster_whisper") is not None
+whisper = None
+
+# Optional WebRTC voice activity detection
 try:
-    import whisper
-    WHISPER_AVAILABLE = True
-except Exception as e:
-    print(f"Whisper not available: {e}")
-    WHISPER_AVAILABLE = False
-    whisper = None
+    import webrtcvad
+    WEBRTCVAD_AVAILABLE = True
+except ImportError:
+    WEBRTCVAD_AVAILABLE = False
+    webrtcvad = None
 
 class SpeechToTextService:
-    def __init__(self):
-        self.whisper_model = None
+    # One Whisper model per process, shared by every service instance
+    _shared_model: ClassVar[Optional[Any]] = None
+    _shared_backend: ClassVar[Optional[str]] = None  # "faster-whisper" or "whisper"
+    _model_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+    _worker_pool: ClassVar[Optional[ProcessPoolExecutor]] = None
+    
+    # LRU cache of recent transcriptions keyed by (audio hash, language, model)
+    _transcription_cache: ClassVar["OrderedDict[tuple, Dict[str, Any]]"] = OrderedDict()
+    _cache_lock: ClassVar[asyncio.Lock] = asyncio.Lock()
+    
+    def __init__(self, max_batch_size: int = 8, max_wait_ms: int = 20,
+                 worker_processes: int = int(os.environ.get("SPEECH_WORKER_PROCESSES", "0"))):
         self.recognizer = sr.Recognizer()
-        self.whisper_available = WHISPER_AVAILABLE
-        self.pydub_available = PYDUB_AVAILABLE
+        self.whisper_available = FASTER_WHISPER_AVAILABLE or WHISPER_AVAILABLE
+        self.ffmpeg_available = shutil.which("ffmpeg") is not None
+        
+        # Dynamic batching of concurrent short clips (openai-whisper backend)
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._batch_queue: Optional[asyncio.Queue] = None
+        self._batcher_task: Optional[asyncio.Task] = None
+        
+        # WebRTC voice activity detector for silence trimming and streaming
+        self.vad = webrtcvad.Vad(2) if WEBRTCVAD_AVAILABLE else None
+        
+        # Optional pool of worker processes, each with its own model
+        self.worker_processes = worker_processes
+        
+    @property
+    def whisper_model(self):
+        """Process-wide Whisper model (None until initialized)"""
+        return SpeechToTextService._shared_model
         
     async def initialize_whisper(self):
         """Initialize Whisper model for speech recognition"""
@@ -35,58 +94,221 @@ class SpeechToTextService:
             print("Whisper not available, skipping initialization")
             return
             
+        # Serialize concurrent first requests so the model is only loaded once
+        async with SpeechToTextService._model_lock:
+            if SpeechToTextService._shared_model is not None:
+                return
+                
+            try:
+                model, backend = await asyncio.to_thread(self._load_model)
+                SpeechToTextService._shared_model = model
+                SpeechToTextService._shared_backend = backend
+                print(f"Whisper model initialized successfully ({backend})")
+            except Exception as e:
+                print(f"Failed to initialize Whisper: {e}")
+                self.whisper_available = False
+                return
+                
+            if self.worker_processes > 0 and SpeechToTextService._worker_pool is None:
+                # Spawn (not fork) so each worker can set up its own CUDA context
+                SpeechToTextService._worker_pool = ProcessPoolExecutor(
+                    max_workers=self.worker_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_whisper_in_worker
+                )
+                print(f"Started {self.worker_processes} Whisper worker processes")
+                
+    async def warmup(self):
+        """Load Whisper and run one silent pass so the first request is not slowed down"""
+        await self.initialize_whisper()
+        if not self.whisper_model:
+            return
+            
+        started = time.perf_counter()
         try:
-            self.whisper_model = whisper.load_model("base")
-            print("Whisper model initialized successfully")
+            await asyncio.to_thread(self._warmup_pass)
+            print(f"Whisper warm-up completed in {time.perf_counter() - started:.2f}s")
         except Exception as e:
-            print(f"Failed to initialize Whisper: {e}")
-            self.whisper_available = False
+            print(f"Whisper warm-up failed: {e}")
             
-    def _convert_to_wav(self, audio_bytes: bytes, input_format: str = "webm") -> bytes:
-        """Convert audio to WAV format using pydub with FFmpeg"""
-        if not self.pydub_available:
-            raise Exception("pydub not available for audio conversion")
+    def _warmup_pass(self):
+        """Transcribe one second of silence to trigger kernel setup (blocking)"""
+        self._run_whisper(np.zeros(16000, dtype=np.float32), "en")
+        
+        if SpeechToTextService._shared_backend == "whisper" and self.whisper_model.device.type == "cuda":
+            import torch
+            torch.cuda.synchronize()
             
-        try:
-            # Load audio from bytes - pydub will use FFmpeg automatically for WebM
-            audio = AudioSegment.from_file(BytesIO(audio_bytes), format=input_format)
+    @classmethod
+    def shutdown_workers(cls):
+        """Stop the Whisper worker process pool, if running"""
+        if cls._worker_pool is not None:
+            cls._worker_pool.shutdown(wait=False, cancel_futures=True)
+            cls._worker_pool = None
+            
+    @staticmethod
+    def _load_model():
+        """Import and load the preferred Whisper backend, returning (model, backend name)"""
+        global whisper
+        
+        if FASTER_WHISPER_AVAILABLE:
+            try:
+                import ctranslate2
+                from faster_whisper import WhisperModel
+                
+                # INT8 weights, with FP16 activations on GPU
+                if ctranslate2.get_cuda_device_count() > 0:
+                    return WhisperModel("base", device="cuda", compute_type="int8_float16"), "faster-whisper"
+                return WhisperModel("base", device="cpu", compute_type="int8"), "faster-whisper"
+            except ImportError as e:
+                print(f"faster-whisper not usable, falling back to openai-whisper: {e}")
+                
+        import whisper as whisper_module
+        whisper = whisper_module
+        model = whisper.load_model("base")
+        
+        # Load the mel filter bank onto the model device once, up front;
+        # mel_filters is lru-cached per device so every later call reuses it
+        whisper.audio.mel_filters(model.device, model.dims.n_mels)
+        return model, "whisper"
+        
+    def _run_whisper(self, audio: np.ndarray, language: str) -> Dict[str, Any]:
+        """Run blocking Whisper inference on a 16kHz float32 PCM array"""
+        model = self.whisper_model
+        
+        if SpeechToTextService._shared_backend == "faster-whisper":
+            segments, info = model.transcribe(
+                audio,
+                language=language,
+                beam_size=1,
+                vad_filter=True,
+                vad_parameters=dict(min_silence_duration_ms=300)
+            )
+            segments = [
+                {"id": segment.id, "start": segment.start, "end": segment.end, "text": segment.text}
+                for segment in segments
+            ]
+            return {
+                "text": "".join(segment["text"] for segment in segments),
+                "language": info.language,
+                "segments": segments
+            }
             
-            # Convert to WAV format suitable for speech_recognition
-            # Set parameters that work well with speech recognition
-            audio = audio.set_frame_rate(16000).set_channels(1)  # 16kHz mono
+        # transcribe() builds the log-mel on the audio's device, so hand it the
+        # audio already on the model device to use the preloaded mel filters there
+        import torch
+        audio = torch.from_numpy(audio).to(model.device)
+        return model.transcribe(audio, language=language, fp16=model.device.type == "cuda")
+        
+    def _decode_batch(self, audios: List[np.ndarray], language: str) -> List[Dict[str, Any]]:
+        """Decode several clips of up to 30s in one padded Whisper forward pass"""
+        import torch
+        
+        model = self.whisper_model
+        mels = torch.stack([
+            whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels, device=model.device)
+            for audio in audios
+        ])
+        
+        options = whisper.DecodingOptions(language=language, fp16=model.device.type == "cuda")
+        results = whisper.decode(model, mels, options)
+        
+        return [
+            {"text": result.text, "language": result.language, "segments": []}
+            for result in results
+        ]
+        
+    async def _batcher(self):
+        """Collect concurrent requests into batches and run them together"""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            batch = [await self._batch_queue.get()]
             
-            # Export to WAV
-            wav_io = BytesIO()
-            audio.export(wav_io, format="wav")
-            return wav_io.getvalue()
+            # Wait up to max_wait_ms for more requests to join the batch
+            deadline = loop.time() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._batch_queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
             
-        except Exception as e:
-            raise Exception(f"Audio conversion from {input_format} failed: {str(e)}")
+            # Decoding options are per batch, so group requests by language
+            by_language = {}
+            for audio, language, future in batch:
+                by_language.setdefault(language, []).append((audio, future))
+                
+            for language, items in by_language.items():
+                try:
+                    results = await asyncio.to_thread(self._decode_batch, [audio for audio, _ in items], language)
+                    for (_, future), result in zip(items, results):
+                        if not future.done():
+                            future.set_result(result)
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+                            
+    async def _transcribe_batched(self, audio: np.ndarray, language: str) -> Dict[str, Any]:
+        """Queue a clip for the batcher and wait for its result"""
+        if self._batcher_task is None or self._batcher_task.done():
+            self._batch_queue = asyncio.Queue()
+            self._batcher_task = asyncio.create_task(self._batcher())
             
-    async def transcribe_audio_whisper(self, audio_data: str, language: str = "en") -> Dict[str, Any]:
-        """Transcribe audio using Whisper"""
+        future = asyncio.get_running_loop().create_future()
+        await self._batch_queue.put((audio, language, future))
+        return await future
+            
+    async def _decode_to_pcm(self, audio_bytes: bytes) -> bytes:
+        """Decode audio to 16kHz mono PCM16 with a single piped FFmpeg call"""
+        if not self.ffmpeg_available:
+            raise Exception("FFmpeg not available for audio conversion")
+            
+        # Name the container up front so FFmpeg skips probing the input
+        audio_format = self._sniff_format(audio_bytes)
+        input_args = ["-f", audio_format] if audio_format else []
+        
+        process = await asyncio.create_subprocess_exec(
+            "ffmpeg", *input_args, "-i", "pipe:0", "-f", "s16le", "-ac", "1", "-ar", "16000", "pipe:1",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+        pcm_bytes, _ = await process.communicate(audio_bytes)
+        
+        if process.returncode != 0:
+            raise Exception(f"FFmpeg audio decoding failed with exit code {process.returncode}")
+        return pcm_bytes
+            
+    async def transcribe_audio_whisper_bytes(self, audio_bytes: bytes, language: str = "en") -> Dict[str, Any]:
+        """Transcribe raw audio bytes using Whisper from an in-memory PCM array"""
         if not self.whisper_model:
             await self.initialize_whisper()
             
         try:
-            # Fix base64 padding if needed
-            missing_padding = len(audio_data) % 4
-            if missing_padding:
-                audio_data += '=' * (4 - missing_padding)
-            
-            # Decode base64 audio data
-            audio_bytes = base64.b64decode(audio_data)
-            
-            # Create temporary file with appropriate extension for WebM
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".webm") as tmp_file:
-                tmp_file.write(audio_bytes)
-                tmp_filename = tmp_file.name
-                
-            # Transcribe using Whisper (Whisper can handle various formats)
-            result = self.whisper_model.transcribe(tmp_filename, language=language)
+            # Decode straight to PCM and hand Whisper a float32 array (no temp file)
+            pcm_bytes = await self._decode_to_pcm(audio_bytes)
+            
+            # faster-whisper runs its own Silero VAD; otherwise drop leading and
+            # trailing silence so the model only sees the spoken part
+            if SpeechToTextService._shared_backend != "faster-whisper":
+                pcm_bytes = self._trim_silence(pcm_bytes)
+            audio = np.frombuffer(pcm_bytes, np.int16).astype(np.float32) / 32768.0
             
-            # Clean up temporary file
-            os.unlink(tmp_filename)
+            # Worker processes run inference in parallel when configured; otherwise
+            # short clips on openai-whisper share a batched forward pass and
+            # everything else runs off the event loop so other requests keep flowing
+            if SpeechToTextService._worker_pool is not None:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    SpeechToTextService._worker_pool, _worker_transcribe, pcm_bytes, language
+                )
+            elif SpeechToTextService._shared_backend == "whisper" and len(audio) <= whisper.audio.N_SAMPLES:
+                result = await self._transcribe_batched(audio, language)
+            else:
+                result = await asyncio.to_thread(self._run_whisper, audio, language)
             
             return {
                 "text": result["text"],
@@ -98,82 +320,197 @@ class SpeechToTextService:
         except Exception as e:
             raise Exception(f"Speech recognition failed: {str(e)}")
             
+    def _trim_silence(self, pcm_bytes: bytes) -> bytes:
+        """Cut leading and trailing non-speech from 16kHz PCM16 audio"""
+        if self.vad is None:
+            return pcm_bytes
+            
+        frame_bytes = 480 * 2  # 30 ms frames
+        voiced = [
+            start for start in range(0, len(pcm_bytes) - frame_bytes + 1, frame_bytes)
+            if self.vad.is_speech(pcm_bytes[start:start + frame_bytes], 16000)
+        ]
+        if not voiced:
+            # Let the model decide rather than discarding the whole clip
+            return pcm_bytes
+        return pcm_bytes[voiced[0]:voiced[-1] + frame_bytes]
+        
+    def _is_silence(self, pcm_bytes: bytes) -> bool:
+        """Check whether a 16kHz PCM16 chunk contains no speech"""
+        if self.vad is not None:
+            frame_bytes = 480 * 2  # 30 ms frames
+            for start in range(0, len(pcm_bytes) - frame_bytes + 1, frame_bytes):
+                if self.vad.is_speech(pcm_bytes[start:start + frame_bytes], 16000):
+                    return False
+            return True
+            
+        # Energy threshold fallback when webrtcvad is not installed
+        samples = np.frombuffer(pcm_bytes, np.int16)
+        return samples.size == 0 or float(np.abs(samples).mean()) < 300
+        
+    async def transcribe_stream(self, websocket, language: str = "en", chunk_ms: int = 750, overlap_ms: int = 200):
+        """Stream partial transcriptions of 16kHz mono PCM16 audio from a websocket
+        
+        Binary frames carry audio; a text frame "end" flushes the final result.
+        """
+        if not self.whisper_model:
+            await self.initialize_whisper()
+            
+        chunk_bytes = 16000 * 2 * chunk_ms // 1000
+        overlap_bytes = 16000 * 2 * overlap_ms // 1000
+        max_utterance_bytes = 16000 * 2 * 30  # Whisper's 30 s context window
+        
+        pending = bytearray()    # Audio received but not yet transcribed
+        utterance = bytearray()  # Context for the current utterance
+        has_speech = False
+        
+        async def emit(result_type: str):
+            audio = np.frombuffer(bytes(utterance), np.int16).astype(np.float32) / 32768.0
+            result = await asyncio.to_thread(self._run_whisper, audio, language)
+            await websocket.send_json({"type": result_type, "text": result["text"].strip(), "language": language})
+            
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+                
+            finished = message.get("text") == "end"
+            if message.get("bytes"):
+                pending += message["bytes"]
+                
+            while len(pending) >= chunk_bytes or (finished and pending):
+                chunk = bytes(pending[:chunk_bytes])
+                del pending[:chunk_bytes]
+                utterance += chunk
+                
+                if self._is_silence(chunk):
+                    # Silence after speech ends the utterance
+                    if has_speech:
+                        await emit("final")
+                        has_speech = False
+                    # Keep only a short overlap for boundary coherence
+                    del utterance[:max(0, len(utterance) - overlap_bytes)]
+                elif len(utterance) >= max_utterance_bytes:
+                    await emit("final")
+                    has_speech = False
+                    del utterance[:max(0, len(utterance) - overlap_bytes)]
+                else:
+                    has_speech = True
+                    await emit("partial")
+                    
+            if finished:
+                if has_speech:
+                    await emit("final")
+                return
+        
+    @staticmethod
+    def _sniff_format(audio_bytes: bytes) -> Optional[str]:
+        """Identify the audio container from its magic bytes, returning the FFmpeg demuxer name"""
+        view = memoryview(audio_bytes)
+        if len(view) < 12:
+            return None
+            
+        head, size_or_box, subtype = struct.unpack_from("4s4s4s", view)
+        if head == b"\x1a\x45\xdf\xa3":
+            return "matroska"  # EBML header: webm / mkv
+        if head == b"OggS":
+            return "ogg"
+        if head == b"RIFF" and subtype == b"WAVE":
+            return "wav"
+        if head == b"fLaC":
+            return "flac"
+        if size_or_box == b"ftyp":
+            return "mov"  # ISO BMFF: mp4 / m4a
+        if head[:3] == b"ID3":
+            return "mp3"
+        if head[0] == 0xFF and head[1] & 0xE0 == 0xE0:
+            # Same frame sync for both; ADTS AAC has layer bits 00, MPEG audio doesn't
+            return "mp3" if head[1] & 0x06 else "aac"
+        return None
+        
+    @staticmethod
+    def _decode_base64(audio_data: str) -> bytearray:
+        """Decode a base64 audio payload, tolerating missing padding"""
+        # Decode the ASCII str straight into a mutable buffer, with no bytes
+        # encode first; FFmpeg stdin, BytesIO and the cache hash all accept it as-is
+        tail_length = len(audio_data) % 4
+        if not tail_length:
+            return b64decode_as_bytearray(audio_data, validate=False)
+            
+        # Decode the complete quanta in bounded slices and re-pad only the 1-3
+        # character tail, rather than building a padded copy of the whole payload
+        bulk_length = len(audio_data) - tail_length
+        audio_bytes = bytearray()
+        for start in range(0, bulk_length, BASE64_CHUNK_CHARS):
+            end = min(start + BASE64_CHUNK_CHARS, bulk_length)
+            audio_bytes += b64decode_as_bytearray(audio_data[start:end], validate=False)
+        audio_bytes += b64decode_as_bytearray(audio_data[bulk_length:] + "=" * (4 - tail_length), validate=False)
+        return audio_bytes
+        
+    async def transcribe_audio_whisper(self, audio_data: str, language: str = "en") -> Dict[str, Any]:
+        """Transcribe base64 audio using Whisper (legacy REST payloads)"""
+        try:
+            audio_bytes = self._decode_base64(audio_data)
+        except Exception as e:
+            raise Exception(f"Speech recognition failed: {str(e)}")
+            
+        return await self.transcribe_audio_whisper_bytes(audio_bytes, language)
+            
     async def transcribe_audio_google(self, audio_data: str, language: str = "en") -> Dict[str, Any]:
-        """Transcribe audio using Google Speech Recognition with format conversion"""
+        """Transcribe base64 audio using Google Speech Recognition"""
         try:
-            # Fix base64 padding if needed
-            missing_padding = len(audio_data) % 4
-            if missing_padding:
-                audio_data += '=' * (4 - missing_padding)
-                
-            # Decode base64 audio data
-            audio_bytes = base64.b64decode(audio_data)
+            audio_bytes = self._decode_base64(audio_data)
+        except Exception as e:
+            raise Exception(f"Audio processing error: {str(e)}")
             
-            # First, try direct WAV processing (for when audio is already WAV)
+        return await self.transcribe_audio_google_bytes(audio_bytes, language)
+            
+    async def transcribe_audio_google_bytes(self, audio_bytes: bytes, language: str = "en") -> Dict[str, Any]:
+        """Transcribe raw audio bytes using Google Speech Recognition with format conversion"""
+        try:
+            # First, try direct WAV processing (for when audio is already WAV);
+            # known compressed containers go straight to FFmpeg
+            audio_format = self._sniff_format(audio_bytes)
             try:
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                    tmp_file.write(audio_bytes)
-                    tmp_filename = tmp_file.name
-                    
-                try:
-                    with sr.AudioFile(tmp_filename) as source:
-                        audio = self.recognizer.record(source)
+                if audio_format not in (None, "wav", "flac"):
+                    raise ValueError(f"{audio_format} audio needs conversion")
                     
-                    text = self.recognizer.recognize_google(audio, language=language)
-                    
-                    return {
-                        "text": text,
-                        "confidence": 0.8,
-                        "language": language,
-                        "segments": []
-                    }
-                finally:
-                    os.unlink(tmp_filename)
+                with sr.AudioFile(BytesIO(audio_bytes)) as source:
+                    audio = await asyncio.to_thread(self.recognizer.record, source)
+                
+                text = await asyncio.to_thread(self.recognizer.recognize_google, audio, language=language)
+                
+                return {
+                    "text": text,
+                    "confidence": 0.8,
+                    "language": language,
+                    "segments": []
+                }
                     
             except Exception as direct_error:
                 print(f"Direct WAV processing failed: {direct_error}")
                 
-                # If direct processing fails, try format conversion with pydub
-                if self.pydub_available:
-                    print("Attempting audio format conversion...")
+                # If direct processing fails, decode once with FFmpeg
+                print("Attempting audio format conversion...")
+                try:
+                    pcm_bytes = await self._decode_to_pcm(audio_bytes)
+                except Exception as conv_error:
+                    print(f"Audio conversion failed: {conv_error}")
+                    return {
+                        "text": "",
+                        "confidence": 0.0,
+                        "error": "Could not convert audio format - FFmpeg may not be available or audio format not supported"
+                    }
                     
-                    # Try different input formats
-                    for input_format in ["webm", "ogg", "mp3", "m4a"]:
-                        try:
-                            # Convert to WAV using pydub + FFmpeg
-                            wav_bytes = self._convert_to_wav(audio_bytes, input_format)
-                            print(f"Successfully converted from {input_format} to WAV")
-                            
-                            # Now process the converted WAV
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                                tmp_file.write(wav_bytes)
-                                tmp_filename = tmp_file.name
-                                
-                            try:
-                                with sr.AudioFile(tmp_filename) as source:
-                                    audio = self.recognizer.record(source)
-                                
-                                text = self.recognizer.recognize_google(audio, language=language)
-                                
-                                return {
-                                    "text": text,
-                                    "confidence": 0.8,
-                                    "language": language,
-                                    "segments": [],
-                                    "converted_from": input_format
-                                }
-                            finally:
-                                os.unlink(tmp_filename)
-                                
-                        except Exception as conv_error:
-                            print(f"Conversion from {input_format} failed: {conv_error}")
-                            continue
+                # Build the recognizer input straight from the PCM samples
+                audio = sr.AudioData(pcm_bytes, 16000, 2)
+                text = await asyncio.to_thread(self.recognizer.recognize_google, audio, language=language)
                 
-                # If all conversion attempts fail
                 return {
-                    "text": "",
-                    "confidence": 0.0,
-                    "error": "Could not convert audio format - FFmpeg may not be available or audio format not supported"
+                    "text": text,
+                    "confidence": 0.8,
+                    "language": language,
+                    "segments": []
                 }
             
         except sr.UnknownValueError:
@@ -189,18 +526,77 @@ class SpeechToTextService:
             
     async def transcribe_audio(self, audio_data: str, language: str = "en", model: str = "whisper") -> Dict[str, Any]:
         """Main transcription method with fallback options"""
+        try:
+            audio_bytes = self._decode_base64(audio_data)
+        except Exception as e:
+            raise Exception(f"Audio processing error: {str(e)}")
+            
+        # Identical audio (retries, double submits) is answered from the cache
+        cache_key = (_content_hash(audio_bytes), language, model)
+        async with SpeechToTextService._cache_lock:
+            cached = SpeechToTextService._transcription_cache.get(cache_key)
+            if cached is not None:
+                SpeechToTextService._transcription_cache.move_to_end(cache_key)
+                return dict(cached)
+                
+        result = await self._transcribe_bytes(audio_bytes, language, model)
+        
+        if result.get("text") and not result.get("error"):
+            async with SpeechToTextService._cache_lock:
+                SpeechToTextService._transcription_cache[cache_key] = result
+                if len(SpeechToTextService._transcription_cache) > TRANSCRIPTION_CACHE_SIZE:
+                    SpeechToTextService._transcription_cache.popitem(last=False)
+        return dict(result)
+        
+    async def _transcribe_bytes(self, audio_bytes: bytes, language: str, model: str) -> Dict[str, Any]:
+        """Dispatch decoded audio to Whisper or Google with fallback"""
         try:
             if model == "whisper" and self.whisper_available and self.whisper_model:
-                return await self.transcribe_audio_whisper(audio_data, language)
+                return await self.transcribe_audio_whisper_bytes(audio_bytes, language)
             else:
                 # Fallback to Google Speech Recognition
-                return await self.transcribe_audio_google(audio_data, language)
+                return await self.transcribe_audio_google_bytes(audio_bytes, language)
         except Exception as e:
             # Try fallback if primary method fails
             if model == "whisper":
                 try:
-                    return await self.transcribe_audio_google(audio_data, language)
+                    return await self.transcribe_audio_google_bytes(audio_bytes, language)
                 except Exception as fallback_error:
                     raise Exception(f"All transcription methods failed. Primary: {str(e)}, Fallback: {str(fallback_error)}")
             else:
-                raise e
\ No newline at end of file
+                raise e
+
+# Per-process state for the Whisper worker pool
+_worker_service: Optional[SpeechToTextService] = None
+_worker_stream = None
+
+def _init_whisper_in_worker():
+    """Load a private Whisper model (and CUDA stream) in a pool worker process"""
+    global _worker_service, _worker_stream
+    
+    model, backend = SpeechToTextService._load_model()
+    SpeechToTextService._shared_model = model
+    SpeechToTextService._shared_backend = backend
+    _worker_service = SpeechToTextService(worker_processes=0)
+    
+    if backend == "whisper" and model.device.type == "cuda":
+        import torch
+        _worker_stream = torch.cuda.Stream()
+
+def _worker_transcribe(pcm_bytes: bytes, language: str) -> Dict[str, Any]:
+    """Transcribe 16kHz PCM16 audio inside a pool worker process"""
+    audio = np.frombuffer(pcm_bytes, np.int16).astype(np.float32) / 32768.0
+    
+    if _worker_stream is None:
+        result = _worker_service._run_whisper(audio, language)
+    else:
+        import torch
+        with torch.cuda.stream(_worker_stream):
+            result = _worker_service._run_whisper(audio, language)
+        _worker_stream.synchronize()
+        
+    return {
+        "text": result["text"],
+        "language": result.get("language", language),
+        "segments": result.get("segments", [])
+    }
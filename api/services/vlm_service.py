@@ -1,22 +1,338 @@
 import asyncio
-import base64
 import json
-import tempfile
+import random
+import re
+import sqlite3
+import struct
+import threading
 import os
-from typing import List, Dict, Optional
+import uuid
+import itertools
+import multiprocessing
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, List, Dict, Optional, Tuple, Union
 from datetime import datetime
 import numpy as np
-import cv2
-from pathlib import Path
+
+# SIMD base64 codec with stdlib fallback (same API)
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+def _decode_frame(frame_base64: str) -> bytes:
+    """Decode a base64 frame to raw image bytes"""
+    return base64.b64decode(frame_base64, validate=True)
+
+def _encode_frame(frame_bytes: bytes) -> str:
+    """Encode raw image bytes as base64 text"""
+    return base64.b64encode(frame_bytes).decode("ascii")
+
+# orjson for metadata/alert serialization, with stdlib fallback
+try:
+    import orjson
+    
+    def _json_dumps(obj) -> str:
+        """Serialize to compact JSON text"""
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode()
+except ImportError:
+    _json_dumps = json.dumps
+
+def _jpeg_size(jpeg_bytes: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG's frame header, or None if it can't be found"""
+    if jpeg_bytes[:2] != b"\xff\xd8":
+        return None
+    offset = 2
+    while offset + 9 <= len(jpeg_bytes):
+        if jpeg_bytes[offset] != 0xFF:
+            return None
+        marker = jpeg_bytes[offset + 1]
+        if marker == 0xFF:  # Fill byte
+            offset += 1
+        elif 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):  # Start of frame
+            height, width = struct.unpack_from(">HH", jpeg_bytes, offset + 5)
+            return width, height
+        else:
+            offset += 2 + struct.unpack_from(">H", jpeg_bytes, offset + 2)[0]
+    return None
+
+def _dct_factor(jpeg_bytes: bytes, short_side: int = 0, long_side: int = 0) -> int:
+    """Largest JPEG decode reduction (1, 2, 4 or 8) that keeps both sides at least this long"""
+    size = _jpeg_size(jpeg_bytes)
+    if size is not None:
+        for factor in (8, 4, 2):
+            if min(size) // factor >= short_side and max(size) // factor >= long_side:
+                return factor
+    return 1
+
+def _imdecode_scaled(jpeg_bytes: bytes, factor: int = 1, grayscale: bool = False) -> Optional[np.ndarray]:
+    """Decode a JPEG at 1/factor scale (BGR or grayscale)"""
+    import cv2
+    
+    # libjpeg-turbo scales in the IDCT, so reduced decodes skip most of the work
+    flags = {
+        1: cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR,
+        2: cv2.IMREAD_REDUCED_GRAYSCALE_2 if grayscale else cv2.IMREAD_REDUCED_COLOR_2,
+        4: cv2.IMREAD_REDUCED_GRAYSCALE_4 if grayscale else cv2.IMREAD_REDUCED_COLOR_4,
+        8: cv2.IMREAD_REDUCED_GRAYSCALE_8 if grayscale else cv2.IMREAD_REDUCED_COLOR_8,
+    }
+    return cv2.imdecode(np.frombuffer(jpeg_bytes, np.uint8), flags[factor])
+
+def _downsample_for_vlm(jpeg_bytes: bytes, target: int = 448, quality: int = 85) -> bytes:
+    """Shrink a JPEG so its longest side is at most target pixels"""
+    import cv2
+    
+    factor = _dct_factor(jpeg_bytes, long_side=target)
+    image = _imdecode_scaled(jpeg_bytes, factor)
+    if image is None:
+        return jpeg_bytes
+        
+    height, width = image.shape[:2]
+    scale = target / max(height, width)
+    if scale >= 1 and factor == 1:
+        return jpeg_bytes
+        
+    # INTER_AREA averages source pixels, which suits downscaling
+    if scale < 1:
+        image = cv2.resize(image, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    ok, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buffer.tobytes() if ok else jpeg_bytes
+
+# Optional Numba kernel for the motion score, with a NumPy fallback
+try:
+    import numba
+    
+    @numba.njit(cache=True)
+    def _mean_abs_diff_u8(a: np.ndarray, b: np.ndarray) -> float:
+        """Mean absolute difference of two uint8 images without temporaries"""
+        flat_a = a.ravel()
+        flat_b = b.ravel()
+        total = 0
+        for i in range(flat_a.size):
+            total += abs(np.int32(flat_a[i]) - np.int32(flat_b[i]))
+        return total / flat_a.size
+    
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    
+    def _mean_abs_diff_u8(a: np.ndarray, b: np.ndarray) -> float:
+        """Mean absolute difference of two uint8 images"""
+        return float(np.abs(a.astype(np.int16) - b.astype(np.int16)).mean())
+
+def _motion_thumbnail(jpeg_bytes: bytes) -> Optional[np.ndarray]:
+    """Decode a JPEG into a 64x64 grayscale thumbnail for motion scoring"""
+    import cv2
+    
+    image = _imdecode_scaled(jpeg_bytes, _dct_factor(jpeg_bytes, short_side=64), grayscale=True)
+    if image is None:
+        return None
+    return cv2.resize(image, (64, 64), interpolation=cv2.INTER_AREA)
+
+def _motion_score(first_jpeg: bytes, last_jpeg: bytes) -> Optional[float]:
+    """Mean absolute pixel difference (0-255) between two frames, or None if undecodable"""
+    first = _motion_thumbnail(first_jpeg)
+    last = _motion_thumbnail(last_jpeg)
+    if first is None or last is None:
+        return None
+    return float(_mean_abs_diff_u8(first, last))
+
+def _frame_dhash(frame_data: Dict) -> int:
+    """64-bit difference hash of a buffered frame, cached on the frame dict"""
+    frame_hash = frame_data.get("dhash")
+    if frame_hash is None:
+        import cv2
+        
+        # Decoding at 1/8 scale is enough for a 9x8 luma thumbnail
+        image = cv2.imdecode(np.frombuffer(frame_data["frame_bytes"], np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+        if image is None:
+            frame_hash = 0
+        else:
+            thumbnail = cv2.resize(image, (9, 8), interpolation=cv2.INTER_AREA)
+            frame_hash = int.from_bytes(np.packbits(thumbnail[:, :-1] > thumbnail[:, 1:]).tobytes(), "big")
+        frame_data["dhash"] = frame_hash
+    return frame_hash
+
+def _select_keyframes(frames: List[Dict], k: int = 6, min_distance: int = 10) -> List[Dict]:
+    """Pick up to k visually distinct frames (oldest first), always keeping the newest"""
+    keyframes = []
+    last_hash = None
+    for frame_data in reversed(frames):
+        frame_hash = _frame_dhash(frame_data)
+        if last_hash is None or bin(frame_hash ^ last_hash).count("1") > min_distance:
+            keyframes.append(frame_data)
+            last_hash = frame_hash
+            if len(keyframes) == k:
+                break
+    keyframes.reverse()
+    return keyframes
+
+# Windows whose first and last frames differ by less than this are treated as static
+MOTION_THRESHOLD = 2.0
+
+# 15 seconds of frames at 15 FPS
+FRAME_BUFFER_SIZE = 225
+
+# Pending analysis requests kept before the oldest are shed
+ANALYSIS_QUEUE_SIZE = 64
+
+# Analyses running at once in "count" batch mode; concurrent requests let the
+# model server batch them
+ANALYSIS_MAX_CONCURRENCY = 8
+
+# Vision + text tokens allowed in flight at once in "tokens" batch mode, so short
+# windows pack together while full video windows don't oversubscribe the model
+ANALYSIS_TOKEN_BUDGET = 8192
+VIDEO_TOKENS_PER_FRAME = 256  # Video-LLaVA: 224px frames in 14px patches
+IMAGE_TOKENS = 576  # Single key frame sent through the AI service
+TEXT_TOKENS = 228  # Prompt plus up to 100 generated tokens
+
+# Response fields for the free-text fallback parser. Each alternative is a
+# lookahead, so one finditer pass reports every position any field pattern
+# matches at (the same matches separate re.search calls would find)
+_FIELD_PATTERNS = (
+    ("activity", r"activity[^:]*:\s*[\"']?(?P<activity>[^\"'\n,]+)[\"']?"),
+    ("doing", r"doing[^:]*:\s*[\"']?(?P<doing>[^\"'\n,]+)[\"']?"),
+    ("person", r"person is\s+(?P<person>[^,.\n]+)"),
+    ("safety", r"safety[^:]*:\s*[\"']?(?P<safety>normal|unusual|alert|emergency)[\"']?"),
+    ("status", r"status[^:]*:\s*[\"']?(?P<status>normal|unusual|alert|emergency)[\"']?"),
+    ("confidence", r"confidence[^:]*:\s*(?P<confidence>[0-9.]+)"),
+    ("location", r"location[^:]*:\s*[\"']?(?P<location>[^\"'\n,]+)[\"']?"),
+)
+_FIELDS_RE = re.compile("(?=" + "|".join(pattern for _, pattern in _FIELD_PATTERNS) + ")", re.IGNORECASE)
+
+_JSON_DECODER = json.JSONDecoder()
+
+def _extract_json(text: str) -> Optional[Dict]:
+    """Return the first JSON object embedded in text, or None"""
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(obj, dict):
+                return obj
+        except json.JSONDecodeError:
+            pass
+        start = text.find("{", start + 1)
+    return None
+
+# Lookup tables for the mock analyzers and response mapping, built once at import
+_SAFETY_TO_ACTIVITY_TYPE = {
+    "normal": "normal",
+    "unusual": "unusual",
+    "alert": "alert",
+    "emergency": "emergency"
+}
+
+_ACTIVITY_TEMPLATES = {
+    "walking": "Elder observed walking steadily across the room. Movement appears coordinated with {conf:.1%} confidence. Gait analysis suggests normal mobility.",
+    "sitting": "Elder is seated comfortably. Posture appears stable and relaxed. No signs of distress detected with {conf:.1%} confidence.",
+    "standing": "Elder maintaining standing position. Balance appears adequate. Duration and stability monitored with {conf:.1%} confidence.",
+    "watching_tv": "Elder engaged in leisure activity (television viewing). Positioned safely and comfortably with {conf:.1%} confidence.",
+    "slow_movement": "Slower than typical movement pattern observed. May indicate fatigue or mobility changes. Recommend continued monitoring with {conf:.1%} confidence.",
+    "resting": "Elder at rest. Breathing appears regular, posture comfortable. Extended rest period noted with {conf:.1%} confidence."
+}
+_DEFAULT_ACTIVITY_TEMPLATE = "Activity '{activity}' detected with {conf:.1%} confidence. Continuing monitoring."
+
+_ACTIVITY_LOCATIONS = {
+    "morning_routine": "Bedroom/Bathroom",
+    "meal_preparation": "Kitchen",
+    "resting": "Living Room",
+    "evening_activities": "Living Room",
+    "sleep_preparation": "Bedroom"
+}
+
+# Local Video-LLaVA served by vLLM ("vllm"), or the chat AI service (default)
+VLM_BACKEND = os.environ.get("VLM_BACKEND", "ai_service")
+# How concurrent analyses are admitted: "tokens" (ANALYSIS_TOKEN_BUDGET) or "count" (ANALYSIS_MAX_CONCURRENCY)
+VLM_BATCH_MODE = os.environ.get("VLM_BATCH_MODE", "tokens")
+VIDEO_LLAVA_MODEL = os.environ.get("VIDEO_LLAVA_MODEL", "LanguageBind/Video-LLaVA-7B-hf")
+VLM_QUANTIZATION = os.environ.get("VLM_QUANTIZATION") or None  # e.g. "fp8" on Hopper/Ada
+
+# Video-LLaVA is trained on 8 frames per clip and vision tokens grow with frame
+# count, so clips are sampled down to this many frames spread over the window
+VIDEO_LLAVA_NUM_FRAMES = 8
+VIDEO_LLAVA_FRAME_SIZE = 224  # Processor input resolution
+# The fixed instruction comes before the <video> placeholder so every request
+# shares the same token prefix, which vLLM's prefix cache serves from stored KV
+VIDEO_LLAVA_PROMPT = (
+    "USER: Analyze this eldercare monitoring video. What activity is the elder performing? "
+    "Is there any safety concern? Answer as JSON with the keys activity_detected, "
+    "safety_status (normal|unusual|alert|emergency), confidence_score (0.0-1.0), location "
+    "and detailed_analysis.\n<video>\nASSISTANT:"
+)
+
+def _vlm_dtype() -> str:
+    """Half-precision weights: bfloat16 where supported (Ampere+), float16 otherwise"""
+    try:
+        import torch
+        if torch.cuda.is_available() and torch.cuda.is_bf16_supported():
+            return "bfloat16"
+    except ImportError:
+        pass
+    return "float16"
+
+# Decoded RGB frames kept for reuse by overlapping analysis windows
+DECODED_FRAME_CACHE_SIZE = 128
+
+# Processes decoding frames for the vLLM path (0 decodes in a thread instead)
+VLM_PREPROC_PROCESSES = int(os.environ.get("VLM_PREPROC_PROCESSES", str(min(4, os.cpu_count() or 1))))
+
+def _decode_rgb_frames(frame_bytes_list: List[bytes]) -> List[Optional[np.ndarray]]:
+    """Decode JPEG frames into RGB arrays (None for undecodable frames)"""
+    import cv2
+    
+    # The processor resizes the short side to VIDEO_LLAVA_FRAME_SIZE anyway, so
+    # decode at the smallest scale that still covers it
+    images = [
+        _imdecode_scaled(frame_bytes, _dct_factor(frame_bytes, short_side=VIDEO_LLAVA_FRAME_SIZE))
+        for frame_bytes in frame_bytes_list
+    ]
+    return [cv2.cvtColor(image, cv2.COLOR_BGR2RGB) if image is not None else None for image in images]
+
+def _sample_video_frames(frames: List[Dict]) -> List[Dict]:
+    """Pick up to VIDEO_LLAVA_NUM_FRAMES frames spread across the window"""
+    # Sampling on the camera's frame sequence numbers rather than window positions
+    # keeps the same frames selected as the window slides, so their decodes are
+    # reused from the cache; the numbers are contiguous within one camera's buffer
+    stride = max(1, -(-len(frames) // VIDEO_LLAVA_NUM_FRAMES))
+    sampled = [frame_data for frame_data in frames if frame_data["seq"] % stride == 0]
+    return sampled[-VIDEO_LLAVA_NUM_FRAMES:] or frames[-1:]
+
+_INSERT_ANALYTICS_SQL = """
+    INSERT INTO camera_analytics (
+        elder_id, camera_id, image_base64, activity_detected, activity_type,
+        confidence_score, location, duration_seconds, anomaly_detected,
+        ai_analysis, metadata, timestamp
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
 
 class VLMAnalysisService:
     """Video-Language Model Analysis Service for elder care monitoring"""
     
     def __init__(self):
         self.model_name = "video-llava"
-        self.frame_buffer: Dict[int, List[str]] = {}  # Buffer frames for analysis
-        self.analysis_queue = asyncio.Queue()
+        self.db_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'eldercare.db')
+        self._db_conn: Optional[sqlite3.Connection] = None  # Long-lived analytics connection
+        self._db_lock = threading.Lock()
+        self.frame_buffer: Dict[int, Deque[Dict]] = {}  # Buffer frames for analysis
+        self.analysis_queue = asyncio.Queue(maxsize=ANALYSIS_QUEUE_SIZE)
         self.is_processing = False
+        self._ai_service = None  # Shared AIService, created on first use
+        self._last_result: Dict[int, Dict] = {}  # Latest VLM result per camera
+        self._vllm_engine = None  # vLLM AsyncLLMEngine when VLM_BACKEND == "vllm"
+        # Real VLM analyzer, chosen once at startup: (frames, camera_id, elder_id) -> result or None
+        self._vlm_analyze = self._real_vlm_analysis_with_existing_ai
+        self._active_analyses = set()  # (camera_id, elder_id) keys being analyzed
+        self._analysis_tasks = set()  # Strong references to running analysis tasks
+        self._frame_ids = itertools.count()  # Buffered frame ids (cache keys), unique across cameras
+        self._frame_seqs: Dict[int, itertools.count] = {}  # Per-camera frame sequence numbers
+        self._frame_cache: "OrderedDict[int, np.ndarray]" = OrderedDict()  # LRU of decoded frames
+        self._pending_decodes: Dict[int, asyncio.Task] = {}  # Frame id -> decode in progress
+        self._budget_used = 0  # Admission cost of the analyses in flight
+        self._budget_changed: Optional[asyncio.Condition] = None  # Created in the worker's loop
+        self._preproc_pool: Optional[ProcessPoolExecutor] = None  # Frame decode workers (vLLM only)
         
     async def initialize(self):
         """Initialize the VLM service"""
@@ -25,26 +341,91 @@ class VLMAnalysisService:
             # For demo purposes, we'll use a mock implementation
             print("Initializing VLM Analysis Service...")
             print("Note: This is a demo implementation - integrate with actual video-llava when available")
+            
+            # Build the AI service client once instead of per analysis
+            self._get_ai_service()
+            
+            # Open the analytics connection up front
+            with self._db_lock:
+                self._get_db_connection()
+            
+            # Start the local Video-LLaVA engine if configured
+            if VLM_BACKEND == "vllm":
+                self._load_vllm_engine()
+                if self._vllm_engine is not None:
+                    self._vlm_analyze = self._real_vlm_analysis_hf
+                if VLM_PREPROC_PROCESSES > 0 and self._preproc_pool is None:
+                    # Spawn (not fork) so workers don't inherit the engine's CUDA state
+                    self._preproc_pool = ProcessPoolExecutor(
+                        max_workers=VLM_PREPROC_PROCESSES,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+                    print(f"Started {VLM_PREPROC_PROCESSES} VLM preprocessing processes")
+            
+            # Compile (or load the cached) motion kernel before the first window
+            if NUMBA_AVAILABLE:
+                dummy = np.zeros((1, 1), dtype=np.uint8)
+                await asyncio.to_thread(_mean_abs_diff_u8, dummy, dummy)
             return True
         except Exception as e:
             print(f"VLM service initialization failed: {e}")
             return False
     
-    def add_frame_to_buffer(self, camera_id: int, frame_base64: str, timestamp: str):
+    def shutdown(self):
+        """Stop the frame preprocessing process pool, if running"""
+        if self._preproc_pool is not None:
+            self._preproc_pool.shutdown(wait=False, cancel_futures=True)
+            self._preproc_pool = None
+    
+    def _load_vllm_engine(self):
+        """Start a vLLM engine for Video-LLaVA; concurrent requests share its batches"""
+        try:
+            from vllm import AsyncEngineArgs, AsyncLLMEngine
+        except ImportError as e:
+            print(f"vLLM not available, using AI service for VLM analysis: {e}")
+            return
+            
+        engine_args = AsyncEngineArgs(
+            model=VIDEO_LLAVA_MODEL,
+            dtype=_vlm_dtype(),
+            quantization=VLM_QUANTIZATION,
+            gpu_memory_utilization=0.85,
+            max_num_seqs=16,
+            enable_prefix_caching=True
+        )
+        self._vllm_engine = AsyncLLMEngine.from_engine_args(engine_args)
+        self.model_name = VIDEO_LLAVA_MODEL
+        print(f"vLLM engine started for {VIDEO_LLAVA_MODEL}")
+    
+    def _get_ai_service(self):
+        """Return the shared AIService instance, creating it on first use"""
+        if self._ai_service is None:
+            from api.services.ai_service import AIService
+            self._ai_service = AIService()
+        return self._ai_service
+    
+    def add_frame_to_buffer(self, camera_id: int, frame: Union[str, bytes, memoryview], timestamp: str):
         """Add frame to analysis buffer for 15-second clips"""
+        # Keep only last 15 seconds of frames (assuming 15 FPS = 225 frames);
+        # the bounded deque drops the oldest frame on append
         if camera_id not in self.frame_buffer:
-            self.frame_buffer[camera_id] = []
+            self.frame_buffer[camera_id] = deque(maxlen=FRAME_BUFFER_SIZE)
+            self._frame_seqs[camera_id] = itertools.count()
+        
+        # Frames are buffered as raw image bytes (base64 text is a third larger);
+        # base64 input is decoded once here and re-encoded only when sent to the AI.
+        # Raw input is copied exactly once, by bytes() below (a no-op for bytes)
+        if isinstance(frame, str):
+            frame = _decode_frame(frame)
         
         frame_data = {
-            "frame": frame_base64,
+            "id": next(self._frame_ids),
+            "seq": next(self._frame_seqs[camera_id]),
+            "frame_bytes": bytes(frame),
             "timestamp": timestamp
         }
         
         self.frame_buffer[camera_id].append(frame_data)
-        
-        # Keep only last 15 seconds of frames (assuming 15 FPS = 225 frames)
-        if len(self.frame_buffer[camera_id]) > 225:
-            self.frame_buffer[camera_id] = self.frame_buffer[camera_id][-225:]
     
     async def analyze_15_second_clip(self, camera_id: int, elder_id: int = 1) -> Dict:
         """Analyze 15-second video clip using VLM"""
@@ -55,22 +436,33 @@ class VLMAnalysisService:
                     "error": "Insufficient frames for analysis"
                 }
             
-            frames = self.frame_buffer[camera_id][-225:]  # Last 15 seconds
-            
-            # For demo purposes, create a mock analysis
-            # In production, this would call actual video-llava model
-            analysis_result = await self._mock_vlm_analysis(camera_id, frames, elder_id)
-            
-            return {
+            frames = list(self.frame_buffer[camera_id])  # Last 15 seconds
+            result = {
                 "success": True,
                 "camera_id": camera_id,
                 "elder_id": elder_id,
                 "analysis_timestamp": datetime.now().isoformat(),
                 "frames_analyzed": len(frames),
-                "analysis_duration_seconds": 15,
-                **analysis_result
+                "analysis_duration_seconds": 15
             }
             
+            # A static scene after a normal result needs no new VLM pass
+            analysis_result = None
+            previous = self._last_result.get(camera_id)
+            if previous is not None and previous.get("activity_type") == "normal":
+                score = await asyncio.to_thread(_motion_score, frames[0]["frame_bytes"], frames[-1]["frame_bytes"])
+                if score is not None and score < MOTION_THRESHOLD:
+                    analysis_result = {**previous, "motion_score": score, "reused_previous_analysis": True}
+            
+            if analysis_result is None:
+                # For demo purposes, create a mock analysis
+                # In production, this would call actual video-llava model
+                analysis_result = await self._mock_vlm_analysis(camera_id, frames, elder_id)
+                self._last_result[camera_id] = analysis_result
+            
+            result.update(analysis_result)
+            return result
+            
         except Exception as e:
             print(f"VLM analysis error: {e}")
             return {
@@ -81,33 +473,26 @@ class VLMAnalysisService:
     async def _mock_vlm_analysis(self, camera_id: int, frames: List[Dict], elder_id: int) -> Dict:
         """Mock VLM analysis - replace with actual video-llava integration"""
         
-        # TODO: Replace with real Video-LLaVA integration
-        # Example integration options:
-        
-        # Option 1: If Video-LLaVA available via Ollama
-        # return await self._real_vlm_analysis_ollama(frames)
-        
-        # Option 2: If using Hugging Face Video-LLaVA
-        # return await self._real_vlm_analysis_hf(frames)
-        
-        # Option 3: If using OpenAI GPT-4V for video
-        # return await self._real_vlm_analysis_openai(frames)
+        # The real analyzer is picked once in initialize(): the existing AI service
+        # by default, or Hugging Face Video-LLaVA served locally by vLLM.
+        # Other integration options (templates below):
+        # Option 1: Video-LLaVA via Ollama -> self._real_vlm_analysis_ollama(frames)
+        # Option 3: OpenAI GPT-4V for video -> self._real_vlm_analysis_openai(frames)
+        real_result = await self._vlm_analyze(frames, camera_id, elder_id)
+        if real_result is not None:
+            return real_result
+            
+        print("Real VLM analysis failed, using mock")
         
-        # Use actual working VLM - integrate with your AI service
-        try:
-            return await self._real_vlm_analysis_with_existing_ai(frames, camera_id, elder_id)
-        except Exception as e:
-            print(f"Real VLM analysis failed, using mock: {e}")
-            
-            # Fallback to preserve existing activity records
-            if camera_id == 100:  # Elder Activities Sample
-                return await self._analyze_elder_activities(frames)
-            elif camera_id == 101:  # Fall Detection Demo
-                return await self._analyze_fall_detection(frames)
-            elif camera_id == 102:  # Daily Routine Analysis
-                return await self._analyze_daily_routine(frames)
-            else:
-                return await self._analyze_general_activity(frames)
+        # Fallback to preserve existing activity records
+        if camera_id == 100:  # Elder Activities Sample
+            return await self._analyze_elder_activities(frames)
+        elif camera_id == 101:  # Fall Detection Demo
+            return await self._analyze_fall_detection(frames)
+        elif camera_id == 102:  # Daily Routine Analysis
+            return await self._analyze_daily_routine(frames)
+        else:
+            return await self._analyze_general_activity(frames)
     
     async def _analyze_elder_activities(self, frames: List[Dict]) -> Dict:
         """Analyze elder activities sample"""
@@ -117,13 +502,13 @@ class VLMAnalysisService:
             "slow_movement", "resting"
         ]
         
-        detected_activity = np.random.choice(activities)
-        confidence = np.random.uniform(0.7, 0.95)
+        detected_activity = random.choice(activities)
+        confidence = random.uniform(0.7, 0.95)
         
         # Determine activity type and anomaly
         if detected_activity in ["slow_movement", "prolonged_standing"]:
             activity_type = "unusual"
-            anomaly_detected = np.random.choice([True, False], p=[0.3, 0.7])
+            anomaly_detected = random.random() < 0.3
         elif detected_activity == "fall_detected":
             activity_type = "emergency"
             anomaly_detected = True
@@ -159,8 +544,8 @@ class VLMAnalysisService:
             ("person_on_ground", "emergency", True)
         ]
         
-        activity, activity_type, anomaly = np.random.choice(fall_scenarios, p=[0.4, 0.3, 0.2, 0.1])
-        confidence = np.random.uniform(0.85, 0.98) if anomaly else np.random.uniform(0.7, 0.9)
+        activity, activity_type, anomaly = random.choices(fall_scenarios, weights=[0.4, 0.3, 0.2, 0.1], k=1)[0]
+        confidence = random.uniform(0.85, 0.98) if anomaly else random.uniform(0.7, 0.9)
         
         ai_analysis = self._generate_fall_analysis(activity, confidence, anomaly)
         
@@ -189,11 +574,11 @@ class VLMAnalysisService:
             "evening_activities", "sleep_preparation"
         ]
         
-        activity = np.random.choice(routine_activities)
-        confidence = np.random.uniform(0.75, 0.92)
+        activity = random.choice(routine_activities)
+        confidence = random.uniform(0.75, 0.92)
         
         # Routine deviation analysis
-        routine_deviation = np.random.choice([True, False], p=[0.2, 0.8])
+        routine_deviation = random.random() < 0.2
         activity_type = "unusual" if routine_deviation else "normal"
         
         ai_analysis = self._generate_routine_analysis(activity, confidence, routine_deviation)
@@ -221,9 +606,9 @@ class VLMAnalysisService:
             "walking", "sitting", "standing", "moving", "stationary"
         ]
         
-        activity = np.random.choice(general_activities)
-        confidence = np.random.uniform(0.6, 0.85)
-        anomaly = np.random.choice([True, False], p=[0.1, 0.9])
+        activity = random.choice(general_activities)
+        confidence = random.uniform(0.6, 0.85)
+        anomaly = random.random() < 0.1
         
         return {
             "activity_detected": activity,
@@ -238,16 +623,7 @@ class VLMAnalysisService:
     
     def _generate_activity_analysis(self, activity: str, confidence: float) -> str:
         """Generate detailed AI analysis for activities"""
-        analysis_templates = {
-            "walking": f"Elder observed walking steadily across the room. Movement appears coordinated with {confidence:.1%} confidence. Gait analysis suggests normal mobility.",
-            "sitting": f"Elder is seated comfortably. Posture appears stable and relaxed. No signs of distress detected with {confidence:.1%} confidence.",
-            "standing": f"Elder maintaining standing position. Balance appears adequate. Duration and stability monitored with {confidence:.1%} confidence.",
-            "watching_tv": f"Elder engaged in leisure activity (television viewing). Positioned safely and comfortably with {confidence:.1%} confidence.",
-            "slow_movement": f"Slower than typical movement pattern observed. May indicate fatigue or mobility changes. Recommend continued monitoring with {confidence:.1%} confidence.",
-            "resting": f"Elder at rest. Breathing appears regular, posture comfortable. Extended rest period noted with {confidence:.1%} confidence."
-        }
-        
-        return analysis_templates.get(activity, f"Activity '{activity}' detected with {confidence:.1%} confidence. Continuing monitoring.")
+        return _ACTIVITY_TEMPLATES.get(activity, _DEFAULT_ACTIVITY_TEMPLATE).format(activity=activity, conf=confidence)
     
     def _generate_fall_analysis(self, activity: str, confidence: float, anomaly: bool) -> str:
         """Generate detailed fall analysis"""
@@ -269,35 +645,76 @@ class VLMAnalysisService:
     
     def _get_location_for_activity(self, activity: str) -> str:
         """Map activity to likely location"""
-        location_map = {
-            "morning_routine": "Bedroom/Bathroom",
-            "meal_preparation": "Kitchen",
-            "resting": "Living Room",
-            "evening_activities": "Living Room",
-            "sleep_preparation": "Bedroom"
-        }
-        return location_map.get(activity, "Home")
+        return _ACTIVITY_LOCATIONS.get(activity, "Home")
     
     async def process_analysis_queue(self):
-        """Process queued analysis requests"""
+        """Process queued analysis requests, each in its own task as soon as it arrives"""
+        # Every request is stored and alerted on as soon as its own analysis
+        # finishes, so a fall is never held back behind a slower camera
+        self._budget_changed = asyncio.Condition()
+        budget = ANALYSIS_TOKEN_BUDGET if VLM_BATCH_MODE == "tokens" else ANALYSIS_MAX_CONCURRENCY
+        
         while True:
             try:
-                if not self.analysis_queue.empty():
-                    analysis_request = await self.analysis_queue.get()
-                    result = await self.analyze_15_second_clip(
-                        analysis_request["camera_id"],
-                        analysis_request.get("elder_id", 1)
-                    )
-                    
-                    # Store result to database (implement in next step)
-                    await self._store_analysis_result(result)
+                # Suspend until a request arrives instead of polling
+                analysis_request = await self.analysis_queue.get()
+                key = (analysis_request["camera_id"], analysis_request.get("elder_id", 1))
+                
+                # A running analysis already covers this camera's buffer
+                if key in self._active_analyses:
+                    self.analysis_queue.task_done()
+                    continue
                     
-                await asyncio.sleep(1)  # Prevent busy waiting
+                # Admit the request once its cost fits the budget; a single
+                # oversized request still runs when nothing else is in flight
+                cost = self._analysis_cost(analysis_request["camera_id"])
+                async with self._budget_changed:
+                    await self._budget_changed.wait_for(
+                        lambda: self._budget_used == 0 or self._budget_used + cost <= budget
+                    )
+                    self._budget_used += cost
+                
+                self._active_analyses.add(key)
+                task = asyncio.create_task(self._run_analysis(analysis_request, key, cost))
+                self._analysis_tasks.add(task)
+                task.add_done_callback(self._analysis_tasks.discard)
                 
             except Exception as e:
                 print(f"Error processing analysis queue: {e}")
                 await asyncio.sleep(5)
     
+    def _analysis_cost(self, camera_id: int) -> int:
+        """Admission cost of analyzing a camera's buffer under VLM_BATCH_MODE"""
+        if VLM_BATCH_MODE != "tokens":
+            return 1
+        if self._vllm_engine is not None:
+            frame_count = min(VIDEO_LLAVA_NUM_FRAMES, len(self.frame_buffer.get(camera_id, ())))
+            return frame_count * VIDEO_TOKENS_PER_FRAME + TEXT_TOKENS
+        return IMAGE_TOKENS + TEXT_TOKENS
+    
+    async def _run_analysis(self, analysis_request: Dict, key: tuple, cost: int):
+        """Run one queued analysis and return its cost to the budget"""
+        try:
+            await self._analyze_and_store(analysis_request)
+        except Exception as e:
+            print(f"Error processing analysis request: {e}")
+        finally:
+            self._active_analyses.discard(key)
+            async with self._budget_changed:
+                self._budget_used -= cost
+                self._budget_changed.notify_all()
+            self.analysis_queue.task_done()
+    
+    async def _analyze_and_store(self, analysis_request: Dict):
+        """Analyze one queued request and store the result"""
+        result = await self.analyze_15_second_clip(
+            analysis_request["camera_id"],
+            analysis_request.get("elder_id", 1)
+        )
+        
+        # Store result to database
+        await self._store_analysis_result(result)
+    
     async def _store_analysis_result(self, result: Dict):
         """Store VLM analysis result to analytics database"""
         try:
@@ -305,16 +722,6 @@ class VLMAnalysisService:
                 print(f"Skipping storage of failed analysis: {result}")
                 return
             
-            # Import database functionality
-            import sqlite3
-            import json
-            import os
-            
-            # Get database connection
-            db_path = os.path.join(os.path.dirname(__file__), '..', 'database', 'eldercare.db')
-            conn = sqlite3.connect(db_path)
-            cursor = conn.cursor()
-            
             # Extract analysis data
             camera_id = result.get("camera_id", 0)
             elder_id = result.get("elder_id", 1)
@@ -326,6 +733,9 @@ class VLMAnalysisService:
             location = result.get("location", "Camera View")
             duration_seconds = result.get("duration_seconds", 15)
             
+            # One timestamp per analysis, shared by the row, its metadata and any alert
+            analysis_timestamp = result.get("analysis_timestamp") or datetime.now().isoformat()
+            
             # Create metadata with VLM-specific information
             metadata = {
                 "vlm_model": result.get("vlm_model", "video-llava-demo"),
@@ -334,47 +744,63 @@ class VLMAnalysisService:
                 "analysis_details": result.get("analysis_details", {}),
                 "emergency_level": result.get("emergency_level"),
                 "routine_analysis": result.get("routine_analysis"),
-                "analysis_timestamp": result.get("analysis_timestamp"),
+                "analysis_timestamp": analysis_timestamp,
                 "analysis_type": "vlm_video_analysis"
             }
             
-            # Check if we should preserve existing records (don't overwrite)
-            # Insert new record while preserving existing ones
-            cursor.execute("""
-                INSERT INTO camera_analytics (
-                    elder_id, camera_id, image_base64, activity_detected, activity_type,
-                    confidence_score, location, duration_seconds, anomaly_detected,
-                    ai_analysis, metadata, timestamp
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
+            # Emergencies get an alert id up front so the alert can go out
+            # while the row is still being written, and be matched to it later
+            is_emergency = activity_type == "emergency" or result.get("emergency_level") == "critical"
+            if is_emergency:
+                metadata["alert_id"] = uuid.uuid4().hex
+            
+            # Insert new record while preserving existing ones; the blocking
+            # sqlite work runs in a thread so the event loop keeps serving
+            insert_task = asyncio.to_thread(self._insert_analysis_row, (
                 elder_id, camera_id, None,  # No single image for video analysis
                 activity_detected, activity_type, confidence_score, location,
                 duration_seconds, anomaly_detected, ai_analysis,
-                json.dumps(metadata), datetime.now().isoformat()
+                _json_dumps(metadata), analysis_timestamp
             ))
             
-            # Log preservation of existing records
-            cursor.execute("SELECT COUNT(*) FROM camera_analytics WHERE elder_id = ?", (elder_id,))
-            total_records = cursor.fetchone()[0]
-            print(f"Activity record added. Total records for elder {elder_id}: {total_records}")
-            
-            activity_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            if is_emergency:
+                # Trigger the emergency alert alongside the insert
+                activity_id, _ = await asyncio.gather(
+                    insert_task,
+                    self._handle_emergency_detection(result, metadata["alert_id"])
+                )
+                print(f"Emergency alert {metadata['alert_id']} stored as activity {activity_id}")
+            else:
+                activity_id = await insert_task
             
             print(f"VLM analysis stored to database with ID: {activity_id}")
             
-            # Trigger emergency alerts if needed
-            if result.get("activity_type") == "emergency" or result.get("emergency_level") == "critical":
-                await self._handle_emergency_detection(result, activity_id)
-            
         except Exception as e:
             print(f"Error storing VLM analysis result: {e}")
     
-    async def _handle_emergency_detection(self, result: Dict, activity_id: int):
+    def _get_db_connection(self) -> sqlite3.Connection:
+        """Open the shared analytics connection on first use (call with _db_lock held)"""
+        if self._db_conn is None:
+            # Autocommit, usable from the to_thread workers; WAL lets readers
+            # such as the analytics routes proceed during writes
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._db_conn = conn
+        return self._db_conn
+    
+    def _insert_analysis_row(self, row: tuple) -> int:
+        """Insert one camera_analytics row and return its id (blocking)"""
+        # One connection keeps sqlite's prepared-statement cache warm for the INSERT
+        with self._db_lock:
+            cursor = self._get_db_connection().execute(_INSERT_ANALYTICS_SQL, row)
+            return cursor.lastrowid
+    
+    async def _handle_emergency_detection(self, result: Dict, alert_id: str):
         """Handle emergency detection from VLM analysis"""
         try:
-            print(f"EMERGENCY DETECTED by VLM - Activity ID: {activity_id}")
+            print(f"EMERGENCY DETECTED by VLM - Alert ID: {alert_id}")
             
             # Import emergency services
             from api.services.mqtt_service import MQTTService
@@ -383,7 +809,7 @@ class VLMAnalysisService:
             emergency_data = {
                 "type": "emergency_alert",
                 "source": "vlm_analysis",
-                "activity_id": activity_id,
+                "alert_id": alert_id,  # Also stored in the activity row's metadata
                 "camera_id": result.get("camera_id"),
                 "elder_id": result.get("elder_id", 1),
                 "activity_detected": result.get("activity_detected"),
@@ -391,12 +817,12 @@ class VLMAnalysisService:
                 "location": result.get("location", "Home"),
                 "emergency_level": result.get("emergency_level", "high"),
                 "ai_analysis": result.get("ai_analysis", ""),
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": result.get("analysis_timestamp") or datetime.now().isoformat(),
                 "requires_immediate_attention": True
             }
             
             # This could be expanded to send actual notifications
-            print(f"Emergency alert data: {json.dumps(emergency_data, indent=2)}")
+            print(f"Emergency alert data: {_json_dumps(emergency_data)}")
             
             # In a production system, this would:
             # 1. Send MQTT alert to caregivers
@@ -423,28 +849,80 @@ class VLMAnalysisService:
             print(f"Error queueing analysis: {e}")
     
     async def _add_to_queue(self, request: Dict):
-        """Add request to analysis queue"""
-        await self.analysis_queue.put(request)
+        """Add request to analysis queue, shedding the oldest request when full"""
+        # The newest request covers the most recent frames, so it wins over the oldest
+        if self.analysis_queue.full():
+            dropped = self.analysis_queue.get_nowait()
+            self.analysis_queue.task_done()
+            print(f"Analysis queue full, dropped request for camera {dropped['camera_id']}")
+        self.analysis_queue.put_nowait(request)
+        
+        # Start decoding the frames the vLLM pass will sample while the request waits
+        buffer = self.frame_buffer.get(request["camera_id"])
+        if self._vllm_engine is not None and buffer:
+            task = asyncio.create_task(self._decode_frames(_sample_video_frames(list(buffer))))
+            self._analysis_tasks.add(task)
+            task.add_done_callback(self._analysis_tasks.discard)
+    
+    async def _decode_frames(self, frames: List[Dict]) -> List[np.ndarray]:
+        """Decode buffered frames to RGB arrays through the LRU frame cache"""
+        missing = [
+            frame_data for frame_data in frames
+            if frame_data["id"] not in self._frame_cache and frame_data["id"] not in self._pending_decodes
+        ]
+        if missing:
+            task = asyncio.create_task(self._decode_into_cache(missing))
+            for frame_data in missing:
+                self._pending_decodes[frame_data["id"]] = task
+        
+        # Also wait on decodes already started for these frames by a prefetch
+        pending = {self._pending_decodes[frame_data["id"]] for frame_data in frames if frame_data["id"] in self._pending_decodes}
+        if pending:
+            await asyncio.wait(pending)
+        
+        images = []
+        for frame_data in frames:
+            image = self._frame_cache.get(frame_data["id"])
+            if image is not None:
+                self._frame_cache.move_to_end(frame_data["id"])
+                images.append(image)
+        return images
+    
+    async def _decode_into_cache(self, frames: List[Dict]):
+        """Decode frames off the event loop and add them to the LRU frame cache"""
+        try:
+            # Decoding runs in the process pool so it neither blocks the event loop
+            # nor competes for the GIL; only the generate call stays on the loop
+            images = await asyncio.get_running_loop().run_in_executor(
+                self._preproc_pool, _decode_rgb_frames, [frame_data["frame_bytes"] for frame_data in frames]
+            )
+            for frame_data, image in zip(frames, images):
+                if image is not None:
+                    self._frame_cache[frame_data["id"]] = image
+            while len(self._frame_cache) > DECODED_FRAME_CACHE_SIZE:
+                self._frame_cache.popitem(last=False)
+        finally:
+            for frame_data in frames:
+                self._pending_decodes.pop(frame_data["id"], None)
     
     # Real VLM Integration Methods (ready for implementation)
     
-    async def _real_vlm_analysis_with_existing_ai(self, frames: List[Dict], camera_id: int, elder_id: int) -> Dict:
-        """Real VLM analysis using existing AI service with image analysis"""
+    async def _real_vlm_analysis_with_existing_ai(self, frames: List[Dict], camera_id: int, elder_id: int) -> Optional[Dict]:
+        """Real VLM analysis using existing AI service with image analysis (None if unavailable)"""
         try:
-            from api.services.ai_service import AIService
-            ai_service = AIService()
-            
-            # Select key frames for analysis (every 5th frame, max 6 frames)
-            key_frames = frames[::5][-6:] if len(frames) >= 6 else frames
-            
-            if not key_frames:
-                return await self._analyze_general_activity(frames)
-            
-            # Use the most recent frame for analysis
-            latest_frame = key_frames[-1]["frame"]
-            
-            # Create eldercare-specific vision prompt
-            vision_prompt = f"""You are an AI assistant analyzing eldercare monitoring camera footage. 
+            ai_service = self._get_ai_service()
+        except Exception as e:
+            print(f"Real VLM analysis error: {e}")
+            return None
+        
+        if not frames:
+            return await self._analyze_general_activity(frames)
+        
+        # Use the most recent frame for analysis
+        latest_frame = frames[-1]["frame_bytes"]
+        
+        # Create eldercare-specific vision prompt
+        vision_prompt = f"""You are an AI assistant analyzing eldercare monitoring camera footage. 
 
 Analyze this camera image and provide a structured assessment:
 
@@ -474,107 +952,80 @@ Format your response as JSON with these exact keys:
 - "anomaly_detected": boolean
 """
 
-            # Use AI service for image analysis (similar to how chat with images works)
-            try:
-                response = await ai_service.chat_completion(
-                    vision_prompt,
-                    model="gemma3:4b",  # Your existing model
-                    image_data=latest_frame,  # Base64 image
-                )
-                
-                # Parse AI response
-                ai_response_text = response.get("response", "")
-                parsed_result = self._parse_ai_vision_response(ai_response_text)
-                
-                # Map safety status to activity type
-                safety_to_activity_type = {
-                    "normal": "normal",
-                    "unusual": "unusual", 
-                    "alert": "alert",
-                    "emergency": "emergency"
-                }
-                
-                activity_type = safety_to_activity_type.get(parsed_result.get("safety_status", "normal"), "normal")
-                
-                return {
-                    "activity_detected": parsed_result.get("activity_detected", "unknown_activity"),
-                    "activity_type": activity_type,
-                    "confidence_score": float(parsed_result.get("confidence_score", 0.7)),
-                    "anomaly_detected": parsed_result.get("anomaly_detected", activity_type != "normal"),
-                    "ai_analysis": parsed_result.get("detailed_analysis", ai_response_text[:200] + "..."),
-                    "location": parsed_result.get("location", "Camera View"),
-                    "duration_seconds": 15,
-                    "vlm_model": "gemma3:4b-vision-analysis",
-                    "analysis_method": "real_ai_service",
-                    "frames_analyzed": len(key_frames),
-                    "analysis_details": {
-                        "safety_status": parsed_result.get("safety_status", "normal"),
-                        "duration_assessment": parsed_result.get("duration_assessment", "sustained_activity"),
-                        "vision_confidence": parsed_result.get("confidence_score", 0.7),
-                        "analysis_timestamp": datetime.now().isoformat()
-                    }
-                }
-                
-            except Exception as ai_error:
-                print(f"AI service vision analysis error: {ai_error}")
-                # Fallback to basic frame analysis
-                return await self._basic_frame_analysis(latest_frame, camera_id)
+        # Use AI service for image analysis (similar to how chat with images works)
+        try:
+            # Vision encoders work at ~448px anyway, so send a smaller image
+            vlm_frame = await asyncio.to_thread(_downsample_for_vlm, latest_frame)
             
-        except Exception as e:
-            print(f"Real VLM analysis error: {e}")
-            raise e
+            response = await ai_service.chat_completion(
+                vision_prompt,
+                model="gemma3:4b",  # Your existing model
+                image_data=_encode_frame(vlm_frame),  # Base64 image
+            )
+            
+            # Parse AI response
+            ai_response_text = response.get("response", "")
+            parsed_result = self._parse_ai_vision_response(ai_response_text)
+            confidence_score = float(parsed_result.get("confidence_score", 0.7))
+        except Exception as ai_error:
+            print(f"AI service vision analysis error: {ai_error}")
+            # Fallback to basic frame analysis
+            return await self._basic_frame_analysis(latest_frame, camera_id)
+        
+        # Map safety status to activity type
+        activity_type = _SAFETY_TO_ACTIVITY_TYPE.get(parsed_result.get("safety_status", "normal"), "normal")
+        
+        return {
+            "activity_detected": parsed_result.get("activity_detected", "unknown_activity"),
+            "activity_type": activity_type,
+            "confidence_score": confidence_score,
+            "anomaly_detected": parsed_result.get("anomaly_detected", activity_type != "normal"),
+            "ai_analysis": parsed_result.get("detailed_analysis", ai_response_text[:200] + "..."),
+            "location": parsed_result.get("location", "Camera View"),
+            "duration_seconds": 15,
+            "vlm_model": "gemma3:4b-vision-analysis",
+            "analysis_method": "real_ai_service",
+            "frames_analyzed": 1,
+            "analysis_details": {
+                "safety_status": parsed_result.get("safety_status", "normal"),
+                "duration_assessment": parsed_result.get("duration_assessment", "sustained_activity"),
+                "vision_confidence": parsed_result.get("confidence_score", 0.7)
+            }
+        }
     
     def _parse_ai_vision_response(self, response_text: str) -> Dict:
         """Parse AI vision response into structured format"""
         try:
-            import json
-            import re
-            
             # Try to extract JSON from response
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text)
-            if json_match:
-                try:
-                    return json.loads(json_match.group())
-                except json.JSONDecodeError:
-                    pass
-            
-            # Fallback: parse text response manually
-            result = {}
+            parsed = _extract_json(response_text)
+            if parsed is not None:
+                return parsed
             
-            # Extract activity
-            activity_patterns = [
-                r"activity[^:]*:\s*[\"']?([^\"'\n,]+)[\"']?",
-                r"doing[^:]*:\s*[\"']?([^\"'\n,]+)[\"']?",
-                r"person is\s+([^,.\n]+)",
-            ]
+            # Fallback: parse text response manually in a single scan,
+            # keeping the first match of each field pattern
+            found = {}
+            for match in _FIELDS_RE.finditer(response_text):
+                found.setdefault(match.lastgroup, match.group(match.lastgroup))
             
-            for pattern in activity_patterns:
-                match = re.search(pattern, response_text, re.IGNORECASE)
-                if match:
-                    result["activity_detected"] = match.group(1).strip().lower()
-                    break
+            result = {}
             
-            # Extract safety status
-            safety_patterns = [
-                r"safety[^:]*:\s*[\"']?(normal|unusual|alert|emergency)[\"']?",
-                r"status[^:]*:\s*[\"']?(normal|unusual|alert|emergency)[\"']?",
-            ]
+            # Extract activity (patterns in order of preference)
+            activity = found.get("activity") or found.get("doing") or found.get("person")
+            if activity:
+                result["activity_detected"] = activity.strip().lower()
             
-            for pattern in safety_patterns:
-                match = re.search(pattern, response_text, re.IGNORECASE)
-                if match:
-                    result["safety_status"] = match.group(1).lower()
-                    break
+            # Extract safety status
+            safety = found.get("safety") or found.get("status")
+            if safety:
+                result["safety_status"] = safety.lower()
             
             # Extract confidence
-            conf_match = re.search(r"confidence[^:]*:\s*([0-9.]+)", response_text, re.IGNORECASE)
-            if conf_match:
-                result["confidence_score"] = float(conf_match.group(1))
+            if "confidence" in found:
+                result["confidence_score"] = float(found["confidence"])
             
             # Extract location
-            loc_match = re.search(r"location[^:]*:\s*[\"']?([^\"'\n,]+)[\"']?", response_text, re.IGNORECASE)
-            if loc_match:
-                result["location"] = loc_match.group(1).strip()
+            if "location" in found:
+                result["location"] = found["location"].strip()
             
             # Set defaults
             result.setdefault("activity_detected", "unknown")
@@ -599,14 +1050,14 @@ Format your response as JSON with these exact keys:
                 "anomaly_detected": False
             }
     
-    async def _basic_frame_analysis(self, frame_base64: str, camera_id: int) -> Dict:
+    async def _basic_frame_analysis(self, frame_bytes: bytes, camera_id: int) -> Dict:
         """Basic frame analysis fallback"""
         return {
             "activity_detected": "basic_analysis",
             "activity_type": "normal",
             "confidence_score": 0.6,
             "anomaly_detected": False,
-            "ai_analysis": f"Basic frame analysis for camera {camera_id}",
+            "ai_analysis": f"Basic frame analysis for camera {camera_id}" + ("" if frame_bytes else " (empty frame)"),
             "location": "Camera View", 
             "duration_seconds": 15,
             "vlm_model": "basic-frame-analysis",
@@ -619,8 +1070,7 @@ Format your response as JSON with these exact keys:
             # Example integration with Ollama Video-LLaVA
             # This would require Video-LLaVA model installed in Ollama
             
-            from api.services.ai_service import AIService
-            ai_service = AIService()
+            ai_service = self._get_ai_service()
             
             # Create video analysis prompt
             prompt = """
@@ -658,53 +1108,52 @@ Format your response as JSON with these exact keys:
             # Fallback to mock
             return await self._analyze_general_activity(frames)
     
-    async def _real_vlm_analysis_hf(self, frames: List[Dict]) -> Dict:
-        """Real Video-LLaVA analysis via Hugging Face"""
+    async def _real_vlm_analysis_hf(self, frames: List[Dict], camera_id: int, elder_id: int) -> Optional[Dict]:
+        """Real Video-LLaVA analysis via a local vLLM engine"""
         try:
-            # Example Hugging Face Video-LLaVA integration
-            # pip install transformers torch pillow
-            
-            # from transformers import VideoLlavaProcessor, VideoLlavaForConditionalGeneration
-            # import torch
-            # from PIL import Image
-            # import io
-            
-            # # Load model (do this once during initialization)
-            # model = VideoLlavaForConditionalGeneration.from_pretrained(
-            #     "LanguageBind/Video-LLaVA-7B-hf"
-            # )
-            # processor = VideoLlavaProcessor.from_pretrained("LanguageBind/Video-LLaVA-7B-hf")
+            from vllm import SamplingParams
             
-            # # Convert base64 frames to images
-            # video_frames = []
-            # for frame_data in frames[-30:]:  # Use last 30 frames (2 seconds at 15fps)
-            #     image_bytes = base64.b64decode(frame_data["frame"])
-            #     image = Image.open(io.BytesIO(image_bytes))
-            #     video_frames.append(image)
+            # Sample frames evenly across the whole window rather than feeding the
+            # last 30 frames (2 seconds at 15fps): fewer vision tokens, more coverage
+            images = await self._decode_frames(_sample_video_frames(frames))
+            if not images:
+                raise ValueError("no decodable frames in window")
+            video = np.stack(images)
             
-            # # Create prompt for elder care analysis
-            # prompt = "USER: <video>Analyze this eldercare monitoring video. What activity is the elder performing? Is there any safety concern? ASSISTANT:"
+            # Each camera's request is submitted on its own; vLLM's continuous
+            # batching runs requests that are in flight together in shared forward passes
+            request = {"prompt": VIDEO_LLAVA_PROMPT, "multi_modal_data": {"video": video}}
+            sampling_params = SamplingParams(max_tokens=100, temperature=0.0)
             
-            # # Process and generate
-            # inputs = processor(text=prompt, videos=[video_frames], return_tensors="pt")
-            # generate_ids = model.generate(**inputs, max_length=100)
-            # response = processor.batch_decode(generate_ids, skip_special_tokens=True)[0]
+            final_output = None
+            async for output in self._vllm_engine.generate(request, sampling_params, request_id=uuid.uuid4().hex):
+                final_output = output
+            response_text = final_output.outputs[0].text
             
-            # # Parse response into structured format
-            # return self._parse_vlm_response(response)
+            # Parse response into structured format
+            parsed_result = self._parse_vlm_response(response_text)
+            activity_type = _SAFETY_TO_ACTIVITY_TYPE.get(parsed_result.get("safety_status", "normal"), "normal")
             
             return {
-                "activity_detected": "analyzed_by_hf_vlm",
-                "confidence_score": 0.90,
-                "activity_type": "normal", 
-                "anomaly_detected": False,
-                "ai_analysis": "Hugging Face Video-LLaVA analysis would go here",
-                "vlm_model": "LanguageBind/Video-LLaVA-7B-hf"
+                "activity_detected": parsed_result.get("activity_detected", "unknown_activity"),
+                "activity_type": activity_type,
+                "confidence_score": float(parsed_result.get("confidence_score", 0.7)),
+                "anomaly_detected": parsed_result.get("anomaly_detected", activity_type != "normal"),
+                "ai_analysis": parsed_result.get("detailed_analysis", response_text[:200]),
+                "location": parsed_result.get("location", "Camera View"),
+                "duration_seconds": 15,
+                "vlm_model": VIDEO_LLAVA_MODEL,
+                "analysis_method": "vllm_video_llava",
+                "frames_analyzed": len(video),
+                "analysis_details": {
+                    "safety_status": parsed_result.get("safety_status", "normal"),
+                    "duration_assessment": parsed_result.get("duration_assessment", "sustained_activity")
+                }
             }
             
         except Exception as e:
             print(f"Hugging Face VLM analysis error: {e}")
-            return await self._analyze_general_activity(frames)
+            return None
     
     async def _real_vlm_analysis_openai(self, frames: List[Dict]) -> Dict:
         """Real video analysis via OpenAI GPT-4V (frame-by-frame)"""
@@ -713,14 +1162,14 @@ Format your response as JSON with these exact keys:
             # import openai
             
             # # Select key frames for analysis (e.g., every 5th frame)
-            # key_frames = frames[::5][-6:]  # Last 6 key frames
+            # key_frames = _select_keyframes(frames)  # Up to 6 distinct frames
             
             # frame_messages = []
             # for i, frame_data in enumerate(key_frames):
             #     frame_messages.append({
             #         "type": "image_url",
             #         "image_url": {
-            #             "url": f"data:image/jpeg;base64,{frame_data['frame']}"
+            #             "url": f"data:image/jpeg;base64,{_encode_frame(frame_data['frame_bytes'])}"
             #         }
             #     })
             
@@ -754,9 +1203,8 @@ Format your response as JSON with these exact keys:
     
     def _parse_vlm_response(self, response_text: str) -> Dict:
         """Parse VLM model response into structured format"""
-        # This would parse the actual VLM response into the required format
-        # Implementation depends on the specific VLM model's output format
-        pass
+        # Video-LLaVA is prompted for the same JSON keys as the vision chat path
+        return self._parse_ai_vision_response(response_text)
 
 # Global VLM service instance
 vlm_service = VLMAnalysisService()
\ No newline at end of file
@@ -8,6 +8,9 @@ BROKER = "localhost"
 PORT = 1883
 CLIENT_ID = "Arduino_Simulator"
 
+# LED command payloads, matched on the raw bytes without decoding
+LED_STATES = {b"ON": "ON", b"OFF": "OFF"}
+
 class ArduinoSimulator:
     def __init__(self):
         # LED states for all rooms
@@ -18,6 +21,10 @@ class ArduinoSimulator:
             "bathroom": "OFF"
         }
         
+        # Topic lookups built once instead of formatted per message
+        self._cmd_topics = {f"home/{room}/lights/cmd": room for room in self.led_status}
+        self._status_topics = {room: f"home/{room}/lights/status" for room in self.led_status}
+        
         # Sensor readings
         self.current_temp = 24.5
         self.current_humidity = 60.0
@@ -45,30 +52,32 @@ class ArduinoSimulator:
             
             # Publish initial status for all rooms
             for room in self.led_status.keys():
-                client.publish(f"home/{room}/lights/status", self.led_status[room])
+                client.publish(self._status_topics[room], self.led_status[room])
                 print(f"Initial {room} status: {self.led_status[room]}")
         else:
             print(f"Connection failed with code {rc}")
 
     def on_message(self, client, userdata, msg):
         topic = msg.topic
-        payload = msg.payload.decode()
         
         # Only print when we receive a new input (command)
-        print(f"New command received - {topic}: {payload}")
+        print(f"New command received - {topic}: {msg.payload.decode(errors='replace')}")
 
         # Handle LED commands for each room (matching Arduino behavior)
-        for room in self.led_status.keys():
-            if topic == f"home/{room}/lights/cmd":
-                if payload in ["ON", "OFF"]:
-                    self.led_status[room] = payload
-                    # Immediately publish status feedback (like Arduino would)
-                    client.publish(f"home/{room}/lights/status", payload)
-                    print(f"LED {room} -> {payload}")
+        room = self._cmd_topics.get(topic)
+        if room is not None:
+            state = LED_STATES.get(msg.payload)
+            if state is not None:
+                self.led_status[room] = state
+                # Immediately publish status feedback (like Arduino would)
+                client.publish(self._status_topics[room], state)
+                print(f"LED {room} -> {state}")
+            return
         
         # Handle target temperature/humidity from UI (matching Arduino)
         if topic == "home/room/data":
             try:
+                payload = msg.payload.decode()
                 # Expected format: "25.5,60.2" (temperature,humidity)
                 if ',' in payload:
                     temp_str, humid_str = payload.split(',')
@@ -101,9 +110,8 @@ class ArduinoSimulator:
         self.client.loop_start()
 
         try:
-            last_sensor_publish = 0
-            last_temp_display = 0
-            last_status_update = 0
+            # Deadlines on the monotonic clock; everything is due immediately
+            next_sensor_publish = next_temp_display = next_status_update = time.monotonic()
             
             print("\nArduino Simulator running...")
             print("LED Controls: Send ON/OFF to home/{room}/lights/cmd")
@@ -113,36 +121,39 @@ class ArduinoSimulator:
             print("Press Ctrl+C to stop\n")
             
             while True:
-                now = time.time()
+                now = time.monotonic()
 
                 # Publish realistic DHT11 sensor data every 5 seconds (quietly)
-                if now - last_sensor_publish > 5:
+                if now >= next_sensor_publish:
                     self.update_sensor_readings()
                     
                     # Format like Arduino: "temperature,humidity"
                     payload = f"{self.current_temp:.1f},{self.current_humidity:.1f}"
                     self.client.publish("home/dht11", payload)
-                    last_sensor_publish = now
+                    next_sensor_publish = now + 5
 
                 # Display temperature every 20 seconds
-                if now - last_temp_display > 20:
+                if now >= next_temp_display:
                     print(f"Temperature: {self.current_temp:.1f}C, Humidity: {self.current_humidity:.1f}% (Target: {self.target_temp:.1f}C)")
-                    last_temp_display = now
+                    next_temp_display = now + 20
 
                 # Publish LED status updates periodically (every 15 seconds) to keep UI in sync (quietly)
-                if now - last_status_update > 15:
+                if now >= next_status_update:
                     for room, status in self.led_status.items():
-                        self.client.publish(f"home/{room}/lights/status", status)
-                    last_status_update = now
+                        self.client.publish(self._status_topics[room], status)
+                    next_status_update = now + 15
 
-                time.sleep(0.5)  # More responsive to commands
+                # Sleep until the next deadline; commands are handled as soon as they
+                # arrive by the MQTT network thread, so no polling tick is needed
+                next_deadline = min(next_sensor_publish, next_temp_display, next_status_update)
+                time.sleep(max(0.0, next_deadline - time.monotonic()))
 
         except KeyboardInterrupt:
             print("\nStopping Arduino simulator...")
             
             # Publish "disconnected" status for all devices
             for room in self.led_status.keys():
-                self.client.publish(f"home/{room}/lights/status", "OFFLINE")
+                self.client.publish(self._status_topics[room], "OFFLINE")
             
             self.client.loop_stop()
             self.client.disconnect()
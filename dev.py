@@ -0,0 +1,5 @@
+"""Development entrypoint: runs the API with auto-reload on code changes"""
+import uvicorn
+
+if __name__ == "__main__":
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -5,6 +5,23 @@ from api.routes import speech_routes, chat_routes, mqtt_routes, eldercare_routes
 from api.services.mqtt_service import MQTTService
 from api.services.speech_service import SpeechToTextService
 import asyncio
+import time
+
+# Ollama client for the /health check, imported once at startup
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+# orjson encodes route responses far faster than the stdlib json encoder
+try:
+    from fastapi.responses import ORJSONResponse
+    import orjson
+    DEFAULT_RESPONSE_CLASS = ORJSONResponse
+except ImportError:
+    from fastapi.responses import JSONResponse
+    DEFAULT_RESPONSE_CLASS = JSONResponse
 
 
 # Global services - Use network MQTT broker IP
@@ -29,7 +46,7 @@ async def lifespan(app: FastAPI):
     
     # Initialize speech recognition service
     try:
-        await speech_service.initialize_whisper()
+        await speech_service.warmup()
         print("Speech recognition service initialized")
     except Exception as e:
         print(f"Speech recognition initialization failed: {e}")
@@ -74,6 +91,9 @@ async def lifespan(app: FastAPI):
         mqtt_service.disconnect()
         print("MQTT service disconnected")
     
+    SpeechToTextService.shutdown_workers()
+    vlm_service.shutdown()
+    
     print("Elder Care Speech Assistant API shutdown complete")
 
 # Initialize FastAPI app with lifespan
@@ -81,7 +101,8 @@ app = FastAPI(
     title="Elder Care Speech Assistant API",
     description="AI-powered speech-to-text eldercare assistant with MQTT integration",
     version="2.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=DEFAULT_RESPONSE_CLASS
 )
 
 # Add CORS middleware
@@ -127,6 +148,30 @@ async def root():
         }
     }
 
+# /health reuses the Ollama model count for this long instead of querying the
+# daemon on every probe
+AI_STATUS_TTL_SECONDS = 10.0
+_ai_status_cache = {"status": None, "expires": 0.0}
+_ai_status_lock = asyncio.Lock()
+
+def _query_ai_status() -> str:
+    """Ask the Ollama daemon how many models it has"""
+    if not OLLAMA_AVAILABLE:
+        return "unavailable"
+    try:
+        models = ollama.list()
+        return f"available ({len(models['models'])} models)"
+    except Exception:
+        return "unavailable"
+
+async def _ai_status() -> str:
+    """Cached Ollama status; the lock lets one caller refresh it while the rest wait"""
+    async with _ai_status_lock:
+        if time.monotonic() >= _ai_status_cache["expires"]:
+            _ai_status_cache["status"] = await asyncio.to_thread(_query_ai_status)
+            _ai_status_cache["expires"] = time.monotonic() + AI_STATUS_TTL_SECONDS
+        return _ai_status_cache["status"]
+
 @app.get("/health")
 async def health_check():
     """Comprehensive health check"""
@@ -155,15 +200,21 @@ async def health_check():
         status["services"]["speech_recognition"] = "error"
     
     # Check AI service
-    try:
-        import ollama
-        models = ollama.list()
-        status["services"]["ai"] = f"available ({len(models['models'])} models)"
-    except Exception:
-        status["services"]["ai"] = "unavailable"
+    status["services"]["ai"] = await _ai_status()
     
     return status
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    # Production server: no file watcher; uvicorn's default "auto" loop/http pick
+    # uvloop and httptools when installed. Camera buffers, the VLM queue and the
+    # MQTT client live in-process, so extra workers (WEB_CONCURRENCY) each keep
+    # their own copy. Use dev.py for auto-reload while developing.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+        reload=False
+    )
\ No newline at end of file
@@ -1,28 +1,91 @@
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 import paho.mqtt.client as mqtt
-import ollama
-import pyttsx3
-from gtts import gTTS
+from api.services.mqtt_service import start_client_on_loop
 import io
 import os
+import hashlib
 import asyncio
+import time
 import json
-from typing import Optional
+import multiprocessing
+import queue
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 import tempfile
 import threading
 
-app = FastAPI(title="AI Server", description="FastAPI server with OLLAMA LLM, TTS, and MQTT")
+# orjson for MQTT/chat payloads and API responses, with stdlib fallback
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse
+    
+    def _json_dumps(obj) -> bytes:
+        """Serialize to compact UTF-8 JSON"""
+        return orjson.dumps(obj)
+    
+    _json_loads = orjson.loads
+    ORJSON_AVAILABLE = True
+except ImportError:
+    def _json_dumps(obj) -> bytes:
+        """Serialize to UTF-8 JSON"""
+        return json.dumps(obj).encode("utf-8")
+    
+    _json_loads = json.loads
+    ORJSON_AVAILABLE = False
+
+# MessagePack variant of the MQTT chat API, for clients that want smaller, faster-to-parse payloads
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+app = FastAPI(
+    title="AI Server",
+    description="FastAPI server with OLLAMA LLM, TTS, and MQTT",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
 
 # Global variables
 mqtt_client = None
-tts_engine = None
+mqtt_network_task = None  # Keeps the MQTT session alive on the event loop
+ollama_client = None  # Shared ollama.AsyncClient, keeps its HTTP connections alive
+background_tasks = set()  # Strong references to fire-and-forget tasks until they finish
+
+# Default chat model, pinned to the 4-bit Q4_K_M build: decoding is memory-bandwidth
+# bound, so smaller weights mean faster replies and more room for parallel requests
+OLLAMA_CHAT_MODEL = os.environ.get("OLLAMA_CHAT_MODEL", "llama3.2:3b-instruct-q4_K_M")
+
+# Chat requests sent to Ollama at once; Ollama batches up to OLLAMA_NUM_PARALLEL
+# concurrent requests per model, extra ones wait here instead of holding worker threads
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "4"))
+ollama_slots = asyncio.Semaphore(OLLAMA_NUM_PARALLEL)
+
+# Replies to repeated prompts (same model, same text ignoring case and outer
+# whitespace) are served from memory; identical prompts in flight share one call
+CHAT_CACHE_SIZE = 1024
+CHAT_CACHE_TTL_SECONDS = 3600.0
+chat_cache: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()  # key -> (expiry, reply)
+chat_inflight: Dict[Tuple[str, str], asyncio.Task] = {}
+chat_cache_stats = {"hits": 0, "coalesced": 0, "misses": 0}
+
+# pyttsx3 isn't thread-safe and its driver probe is slow, so the engine lives in a
+# worker process started on the first pyttsx3 request; a crash there can't take
+# the server down and the next request starts a fresh worker
+PYTTSX3_READY_TIMEOUT = 30.0
+pyttsx3_process = None
+pyttsx3_requests = None  # (text, path) jobs, None to stop
+pyttsx3_results = None  # Error string per job, None on success
+pyttsx3_error = None  # Why the engine failed to initialise, if it did
+pyttsx3_lock = threading.Lock()  # One job at a time, so results pair up with requests
 
 # Models
 class ChatRequest(BaseModel):
     message: str
-    model: str = "llama3.2"
+    model: str = OLLAMA_CHAT_MODEL
+    stream: bool = False  # Stream the reply as Server-Sent Events
 
 class TTSRequest(BaseModel):
     text: str
@@ -37,61 +100,218 @@ class MQTTMessage(BaseModel):
 MQTT_BROKER = "localhost"
 MQTT_PORT = 1883
 MQTT_TOPIC = "ai/responses"
+MQTT_REQUEST_TOPIC = "ai/requests"
+MQTT_MSGPACK_SUFFIX = "/msgpack"  # ai/requests/msgpack is answered on ai/responses/msgpack
+MQTT_STREAM_TOPIC = "ai/responses/stream"  # Token chunks of streamed chat replies
+
+# Rendered speech is cached on disk by content hash, so repeated phrases skip synthesis
+TTS_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ai_server_tts_cache")
+# Past either limit the least recently written files are deleted
+TTS_CACHE_MAX_FILES = 500
+TTS_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+def _tts_cache_path(request: TTSRequest, suffix: str) -> str:
+    """Cache file for a TTS request, keyed on voice, language and text"""
+    key = hashlib.sha1(f"{request.voice}|{request.language}|{request.text}".encode("utf-8")).hexdigest()
+    return os.path.join(TTS_CACHE_DIR, key + suffix)
+
+def _render_to_cache(render, path: str):
+    """Render speech into a temp file beside path, then move it into place atomically"""
+    os.makedirs(TTS_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".", suffix=os.path.splitext(path)[1], dir=TTS_CACHE_DIR)
+    os.close(fd)
+    try:
+        render(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    _prune_tts_cache()
+
+def _prune_tts_cache():
+    """Delete the oldest cached speech files once the cache is over its size limits"""
+    entries = []
+    with os.scandir(TTS_CACHE_DIR) as it:
+        for entry in it:
+            # Dot-prefixed files are renders still in progress
+            if entry.name.startswith(".") or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            
+    total_bytes = sum(size for _, size, _ in entries)
+    if len(entries) <= TTS_CACHE_MAX_FILES and total_bytes <= TTS_CACHE_MAX_BYTES:
+        return
+        
+    entries.sort()
+    for count, (_, size, path) in enumerate(entries):
+        if len(entries) - count <= TTS_CACHE_MAX_FILES and total_bytes <= TTS_CACHE_MAX_BYTES:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass  # Already pruned by a concurrent render
+        total_bytes -= size
+
+def _synthesize_gtts(request: TTSRequest, cache_path: str) -> bytes:
+    """Render gTTS speech in memory and persist it to the cache"""
+    from gtts import gTTS
+    buffer = io.BytesIO()
+    gTTS(text=request.text, lang=request.language, slow=False).write_to_fp(buffer)
+    audio = buffer.getvalue()
+    
+    def render(path):
+        with open(path, "wb") as audio_file:
+            audio_file.write(audio)
+    _render_to_cache(render, cache_path)
+    return audio
+
+def _pyttsx3_worker(requests, results):
+    """Own the pyttsx3 engine and render each (text, path) job it is sent"""
+    try:
+        import pyttsx3
+        engine = pyttsx3.init()
+    except Exception as e:
+        results.put(str(e))
+        return
+    results.put(None)
+    
+    while True:
+        job = requests.get()
+        if job is None:
+            break
+        text, path = job
+        try:
+            engine.save_to_file(text, path)
+            engine.runAndWait()
+            results.put(None)
+        except Exception as e:
+            results.put(str(e))
+
+def _start_pyttsx3_worker():
+    """Start the pyttsx3 worker process unless it is already running"""
+    global pyttsx3_process, pyttsx3_requests, pyttsx3_results, pyttsx3_error
+    if pyttsx3_process and pyttsx3_process.is_alive():
+        return
+    
+    context = multiprocessing.get_context("spawn")
+    pyttsx3_requests = context.Queue()
+    pyttsx3_results = context.Queue()
+    pyttsx3_process = context.Process(
+        target=_pyttsx3_worker, args=(pyttsx3_requests, pyttsx3_results), daemon=True
+    )
+    pyttsx3_process.start()
+    try:
+        pyttsx3_error = pyttsx3_results.get(timeout=PYTTSX3_READY_TIMEOUT)
+    except queue.Empty:
+        pyttsx3_error = "engine did not start in time"
+    if pyttsx3_error:
+        pyttsx3_process.terminate()
+        print(f"Warning: Could not initialize TTS engine: {pyttsx3_error}")
+    else:
+        print("TTS engine initialized successfully")
+
+def _pyttsx3_render(text: str, path: str):
+    """Have the pyttsx3 worker render text into path, blocking until it's written"""
+    with pyttsx3_lock:
+        _start_pyttsx3_worker()
+        if pyttsx3_error:
+            raise RuntimeError(f"TTS engine not initialized: {pyttsx3_error}")
+        
+        pyttsx3_requests.put((text, path))
+        while True:
+            try:
+                error = pyttsx3_results.get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not pyttsx3_process.is_alive():
+                    raise RuntimeError("TTS worker exited while rendering")
+    if error:
+        raise RuntimeError(error)
+
+def _stop_pyttsx3_worker():
+    """Ask the pyttsx3 worker to exit, terminating it if it doesn't"""
+    if pyttsx3_process and pyttsx3_process.is_alive():
+        pyttsx3_requests.put(None)
+        pyttsx3_process.join(timeout=2.0)
+        if pyttsx3_process.is_alive():
+            pyttsx3_process.terminate()
 
 def on_mqtt_connect(client, userdata, flags, rc):
     if rc == 0:
         print(f"Connected to MQTT broker with result code {rc}")
-        client.subscribe("ai/requests")
+        # Shared subscription: with several workers the broker hands each request to one of them
+        topics = [(f"$share/ai-server/{MQTT_REQUEST_TOPIC}", 0)]
+        if MSGPACK_AVAILABLE:
+            topics.append((f"$share/ai-server/{MQTT_REQUEST_TOPIC}{MQTT_MSGPACK_SUFFIX}", 0))
+        client.subscribe(topics)
     else:
         print(f"Failed to connect to MQTT broker with result code {rc}")
 
 def on_mqtt_message(client, userdata, msg):
     try:
-        message = msg.payload.decode('utf-8')
         topic = msg.topic
-        print(f"Received MQTT message from {topic}: {message}")
+        use_msgpack = topic.endswith(MQTT_MSGPACK_SUFFIX)
+        if not use_msgpack:
+            message = msg.payload.decode('utf-8')
+            print(f"Received MQTT message from {topic}: {message}")
         
-        # Process the message with OLLAMA
+        # Process the message with OLLAMA in its own task, so a slow reply
+        # never holds up the messages behind it
         try:
-            data = json.loads(message)
+            if use_msgpack:
+                data = msgpack.unpackb(msg.payload, raw=False)
+                print(f"Received MQTT message from {topic}: {data}")
+            else:
+                data = _json_loads(msg.payload)
             if 'message' in data:
-                response = ollama.chat(
-                    model=data.get('model', 'llama3.2'),
-                    messages=[{'role': 'user', 'content': data['message']}]
-                )
-                ai_response = response['message']['content']
-                
-                # Publish response back to MQTT
-                client.publish("ai/responses", json.dumps({
-                    "original_message": data['message'],
-                    "response": ai_response,
-                    "model": data.get('model', 'llama3.2')
-                }))
+                task = asyncio.create_task(handle_mqtt_request(client, data, use_msgpack))
+                background_tasks.add(task)
+                task.add_done_callback(background_tasks.discard)
         except Exception as e:
             print(f"Error processing MQTT message: {e}")
     except Exception as e:
         print(f"Error decoding MQTT message: {e}")
 
+async def handle_mqtt_request(client, data: dict, use_msgpack: bool = False):
+    """Answer one MQTT chat request and publish the reply in the request's encoding"""
+    try:
+        ai_response = await cached_chat(data.get('model', OLLAMA_CHAT_MODEL), data['message'])
+        
+        # Publish response back to MQTT
+        reply = {
+            "original_message": data['message'],
+            "response": ai_response,
+            "model": data.get('model', OLLAMA_CHAT_MODEL)
+        }
+        if use_msgpack:
+            client.publish(MQTT_TOPIC + MQTT_MSGPACK_SUFFIX, msgpack.packb(reply, use_bin_type=True))
+        else:
+            client.publish(MQTT_TOPIC, _json_dumps(reply))
+    except Exception as e:
+        print(f"Error processing MQTT message: {e}")
+
 @app.on_event("startup")
 async def startup_event():
-    global mqtt_client, tts_engine
+    global mqtt_client, mqtt_network_task, ollama_client
     
-    # Initialize TTS engine
-    try:
-        tts_engine = pyttsx3.init()
-        print("TTS engine initialized successfully")
-    except Exception as e:
-        print(f"Warning: Could not initialize TTS engine: {e}")
+    # One async Ollama client for all /chat requests; ollama, gtts and pyttsx3 are
+    # imported where first used so workers and the TTS process start quickly
+    import ollama
+    ollama_client = ollama.AsyncClient()
     
     # Initialize MQTT client
     try:
-        mqtt_client = mqtt.Client()
+        # Each worker process needs its own client id or the broker drops the others
+        mqtt_client = mqtt.Client(client_id=f"ai-server-{os.getpid()}")
         mqtt_client.on_connect = on_mqtt_connect
         mqtt_client.on_message = on_mqtt_message
         
-        # Try to connect to MQTT broker
-        mqtt_client.connect_async(MQTT_BROKER, MQTT_PORT, 60)
-        mqtt_client.loop_start()
+        # Try to connect to MQTT broker; callbacks run on the event loop
+        mqtt_network_task = start_client_on_loop(mqtt_client, asyncio.get_running_loop(), MQTT_BROKER, MQTT_PORT)
         print("MQTT client initialized")
     except Exception as e:
         print(f"Warning: Could not connect to MQTT broker: {e}")
@@ -99,9 +319,12 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     global mqtt_client
+    if mqtt_network_task:
+        mqtt_network_task.cancel()
     if mqtt_client:
-        mqtt_client.loop_stop()
         mqtt_client.disconnect()
+        mqtt_client.loop_stop()  # No-op unless running on the fallback network thread
+    await asyncio.to_thread(_stop_pyttsx3_worker)
 
 @app.get("/")
 async def root():
@@ -115,27 +338,105 @@ async def root():
         }
     }
 
-@app.post("/chat")
-async def chat_with_ollama(request: ChatRequest):
+async def _publish_bg(topic: str, payload: dict):
+    """Serialize and publish to MQTT from a worker thread, logging instead of raising"""
+    try:
+        await asyncio.to_thread(lambda: mqtt_client.publish(topic, _json_dumps(payload)))
+    except Exception as e:
+        print(f"Error publishing MQTT message to {topic}: {e}")
+
+def _publish_chat_response(request: ChatRequest, ai_response: str):
+    """Publish a finished chat reply to MQTT in the background, if connected"""
+    if mqtt_client:
+        payload = {
+            "type": "chat_response",
+            "message": request.message,
+            "response": ai_response,
+            "model": request.model
+        }
+        # QoS 0 publish: the HTTP reply doesn't wait for it, and the payload is
+        # encoded inside the task so that happens off the request path too
+        task = asyncio.create_task(_publish_bg(MQTT_TOPIC, payload))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+async def _stream_chat(request: ChatRequest):
+    """Yield an Ollama chat reply as Server-Sent Events as tokens are decoded"""
+    chunks = []
     try:
-        response = ollama.chat(
-            model=request.model,
+        async with ollama_slots:
+            stream = await ollama_client.chat(
+                model=request.model,
+                messages=[{
+                    'role': 'user',
+                    'content': request.message
+                }],
+                stream=True
+            )
+            async for chunk in stream:
+                content = chunk['message']['content']
+                chunks.append(content)
+                if mqtt_client:
+                    mqtt_client.publish(MQTT_STREAM_TOPIC, content, qos=0)
+                yield b"data: " + _json_dumps({'content': content}) + b"\n\n"
+    except Exception as e:
+        yield b"event: error\ndata: " + _json_dumps({'detail': f'Error communicating with OLLAMA: {str(e)}'}) + b"\n\n"
+        return
+        
+    _publish_chat_response(request, "".join(chunks))
+    yield b"data: [DONE]\n\n"
+
+async def _generate_chat_reply(key: Tuple[str, str], model: str, message: str) -> str:
+    """Ask Ollama for a reply and cache it"""
+    # Concurrent requests reach Ollama together and share its batched decode steps
+    async with ollama_slots:
+        response = await ollama_client.chat(
+            model=model,
             messages=[{
                 'role': 'user',
-                'content': request.message
+                'content': message
             }]
         )
+    ai_response = response['message']['content']
+    
+    chat_cache[key] = (time.monotonic() + CHAT_CACHE_TTL_SECONDS, ai_response)
+    chat_cache.move_to_end(key)
+    while len(chat_cache) > CHAT_CACHE_SIZE:
+        chat_cache.popitem(last=False)
+    return ai_response
+
+async def cached_chat(model: str, message: str) -> str:
+    """Chat reply from the cache, an identical request in flight, or Ollama"""
+    key = (model, message.strip().lower())
+    entry = chat_cache.get(key)
+    if entry is not None and entry[0] > time.monotonic():
+        chat_cache.move_to_end(key)
+        chat_cache_stats["hits"] += 1
+        return entry[1]
         
-        ai_response = response['message']['content']
+    task = chat_inflight.get(key)
+    if task is None:
+        chat_cache_stats["misses"] += 1
+        task = asyncio.create_task(_generate_chat_reply(key, model, message))
+        chat_inflight[key] = task
+        task.add_done_callback(lambda _: chat_inflight.pop(key, None))
+    else:
+        chat_cache_stats["coalesced"] += 1
+        
+    # Shielded so one caller disconnecting doesn't cancel the reply for the others
+    return await asyncio.shield(task)
+
+@app.post("/chat")
+async def chat_with_ollama(request: ChatRequest):
+    # Streamed replies start arriving after the first token instead of the last
+    if request.stream:
+        return StreamingResponse(_stream_chat(request), media_type="text/event-stream")
+        
+    try:
+        ai_response = await cached_chat(request.model, request.message)
         
         # Optionally publish to MQTT
-        if mqtt_client:
-            mqtt_client.publish(MQTT_TOPIC, json.dumps({
-                "type": "chat_response",
-                "message": request.message,
-                "response": ai_response,
-                "model": request.model
-            }))
+        _publish_chat_response(request, ai_response)
         
         return {
             "message": request.message,
@@ -149,32 +450,33 @@ async def chat_with_ollama(request: ChatRequest):
 async def text_to_speech(request: TTSRequest):
     try:
         if request.voice == "gtts":
-            # Use Google Text-to-Speech
-            tts = gTTS(text=request.text, lang=request.language, slow=False)
-            
-            # Create temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".mp3") as tmp_file:
-                tts.save(tmp_file.name)
-                tmp_filename = tmp_file.name
+            # Use Google Text-to-Speech; the network round trip runs off the event loop
+            cache_path = _tts_cache_path(request, ".mp3")
+            if not os.path.exists(cache_path):
+                # A fresh render is returned from memory rather than read back from disk
+                audio = await asyncio.to_thread(_synthesize_gtts, request, cache_path)
+                return Response(
+                    content=audio,
+                    media_type="audio/mpeg",
+                    headers={"Content-Disposition": 'attachment; filename="speech.mp3"'}
+                )
             
             return FileResponse(
-                path=tmp_filename,
+                path=cache_path,
                 media_type="audio/mpeg",
                 filename="speech.mp3"
             )
             
         elif request.voice == "pyttsx3":
-            if not tts_engine:
-                raise HTTPException(status_code=500, detail="TTS engine not initialized")
-            
-            # Use pyttsx3 for offline TTS
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_file:
-                tts_engine.save_to_file(request.text, tmp_file.name)
-                tts_engine.runAndWait()
-                tmp_filename = tmp_file.name
+            # Use pyttsx3 for offline TTS, rendered by the worker process
+            cache_path = _tts_cache_path(request, ".wav")
+            if not os.path.exists(cache_path):
+                def render(path):
+                    _pyttsx3_render(request.text, path)
+                await asyncio.to_thread(_render_to_cache, render, cache_path)
             
             return FileResponse(
-                path=tmp_filename,
+                path=cache_path,
                 media_type="audio/wav",
                 filename="speech.wav"
             )
@@ -198,6 +500,29 @@ async def send_mqtt_message(request: MQTTMessage):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error sending MQTT message: {str(e)}")
 
+# /health reuses the Ollama model count for this long instead of querying the
+# daemon on every probe
+AI_STATUS_TTL_SECONDS = 10.0
+_ai_status_cache = {"status": None, "expires": 0.0}
+_ai_status_lock = asyncio.Lock()
+
+def _query_ai_status() -> str:
+    """Ask the Ollama daemon how many models it has"""
+    try:
+        import ollama
+        models = ollama.list()
+        return f"available ({len(models['models'])} models)"
+    except Exception:
+        return "unavailable"
+
+async def _ai_status() -> str:
+    """Cached Ollama status; the lock lets one caller refresh it while the rest wait"""
+    async with _ai_status_lock:
+        if time.monotonic() >= _ai_status_cache["expires"]:
+            _ai_status_cache["status"] = await asyncio.to_thread(_query_ai_status)
+            _ai_status_cache["expires"] = time.monotonic() + AI_STATUS_TTL_SECONDS
+        return _ai_status_cache["status"]
+
 @app.get("/health")
 async def health_check():
     status = {
@@ -211,27 +536,34 @@ async def health_check():
     if mqtt_client and mqtt_client.is_connected():
         status["mqtt"] = "connected"
     
-    # Check TTS engine
-    if tts_engine:
+    # Check TTS engine; the pyttsx3 worker only starts on first use
+    if pyttsx3_process and pyttsx3_process.is_alive():
         status["tts"] = "available"
+    elif not pyttsx3_error:
+        status["tts"] = "on demand"
     
     # Check OLLAMA
-    try:
-        models = ollama.list()
-        status["ollama"] = f"available ({len(models['models'])} models)"
-    except Exception:
-        status["ollama"] = "unavailable"
+    status["ollama"] = await _ai_status()
+    status["chat_cache"] = {"entries": len(chat_cache), **chat_cache_stats}
     
     return status
 
 @app.get("/models")
 async def list_models():
     try:
-        models = ollama.list()
+        models = await ollama_client.list()
         return {"models": [model['name'] for model in models['models']]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error listing models: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # uvicorn's "auto" loop/http pick uvloop and httptools when installed
+    uvicorn.run(
+        "main_old:app",
+        host="0.0.0.0",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1))),
+        log_level="warning",
+        access_log=False
+    )
\ No newline at end of file
@@ -2,6 +2,9 @@
 import requests
 import json
 
+# One keep-alive connection for all test requests
+session = requests.Session()
+
 # Test both text and voice for dark room
 test_cases = [
     ("Text", "the room is dark"),
@@ -13,7 +16,7 @@ for chat_type, message in test_cases:
     try:
         print(f"\n=== Testing {chat_type}: '{message}' ===")
         
-        response = requests.post(
+        response = session.post(
             "http://localhost:8000/eldercare/text-assistance",
             json={
                 "message": message,
@@ -1,6 +1,9 @@
 import requests
 import json
 
+# One keep-alive connection for all test requests
+session = requests.Session()
+
 def test_room_lights():
     """Test multi-room light control via API"""
     
@@ -18,7 +21,7 @@ def test_room_lights():
         print(f"\nTesting: '{message}'")
         
         try:
-            response = requests.post(
+            response = session.post(
                 "http://localhost:8000/eldercare/text-assistance",
                 json={
                     "message": message,
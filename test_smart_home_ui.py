@@ -5,6 +5,9 @@ Test the new smart home UI backend integration
 import requests
 import json
 
+# One keep-alive connection for all test requests
+session = requests.Session()
+
 def test_smart_home_backend():
     """Test the new smart home backend endpoints"""
     
@@ -15,7 +18,7 @@ def test_smart_home_backend():
     # Test 1: Get smart home status
     try:
         print("\n1. Testing GET /smart-home/status")
-        response = requests.get(f"{base_url}/smart-home/status", timeout=5)
+        response = session.get(f"{base_url}/smart-home/status", timeout=5)
         if response.status_code == 200:
             data = response.json()
             print("✅ Status endpoint working")
@@ -29,7 +32,7 @@ def test_smart_home_backend():
     # Test 2: Toggle living room light
     try:
         print("\n2. Testing POST /smart-home/lights/living_room/toggle")
-        response = requests.post(
+        response = session.post(
             f"{base_url}/smart-home/lights/living_room/toggle",
             json={"state": True},
             timeout=5
@@ -46,7 +49,7 @@ def test_smart_home_backend():
     # Test 3: Set thermostat
     try:
         print("\n3. Testing POST /smart-home/thermostat/set")
-        response = requests.post(
+        response = session.post(
             f"{base_url}/smart-home/thermostat/set",
             params={"temperature": 24, "humidity": 60},
             timeout=5
@@ -63,7 +66,7 @@ def test_smart_home_backend():
     # Test 4: Send direct MQTT command
     try:
         print("\n4. Testing POST /smart-home/mqtt/send")
-        response = requests.post(
+        response = session.post(
             f"{base_url}/smart-home/mqtt/send",
             json={
                 "topic": "home/living_room/lights/cmd",
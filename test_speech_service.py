@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test speech service helpers - base64 audio decoding, request batching and
+the Whisper -> Google fallback chain
+"""
+import asyncio
+import base64
+import os
+
+import numpy as np
+
+from api.services.speech_service import SpeechToTextService, BASE64_CHUNK_CHARS
+
+def test_decode_base64_padding():
+    """Unpadded and padded payloads decode exactly like base64.b64decode"""
+    # Byte counts giving encoded lengths of 0, 3 and 2 mod 4 once padding is
+    # stripped; the large ones span several decode chunks
+    chunk_bytes = BASE64_CHUNK_CHARS // 4 * 3
+    for size in (0, 1, 2, 3, 300, 301, 302, 2 * chunk_bytes + 1, 2 * chunk_bytes + 2):
+        data = os.urandom(size)
+        padded = base64.b64encode(data).decode("ascii")
+        unpadded = padded.rstrip("=")
+        
+        expected = base64.b64decode(padded)
+        assert SpeechToTextService._decode_base64(padded) == expected, f"padded, {size} bytes"
+        assert SpeechToTextService._decode_base64(unpadded) == expected, f"unpadded, {size} bytes (len % 4 = {len(unpadded) % 4})"
+        
+    print("✅ base64 decoding matches base64.b64decode")
+
+def test_batcher_groups_concurrent_clips():
+    """Concurrent short clips are decoded together, one batch per language"""
+    service = SpeechToTextService(max_batch_size=8, max_wait_ms=50)
+    batches = []
+    
+    def fake_decode_batch(audios, language):
+        batches.append((language, len(audios)))
+        return [{"text": f"{language}:{int(audio[0])}", "language": language, "segments": []} for audio in audios]
+    service._decode_batch = fake_decode_batch
+    
+    async def run():
+        clips = [(np.full(16000, i, dtype=np.float32), "en" if i < 3 else "ms") for i in range(5)]
+        results = await asyncio.gather(*(service._transcribe_batched(audio, language) for audio, language in clips))
+        service._batcher_task.cancel()
+        return results
+        
+    results = asyncio.run(run())
+    assert [result["text"] for result in results] == ["en:0", "en:1", "en:2", "ms:3", "ms:4"]
+    assert sorted(batches) == [("en", 3), ("ms", 2)], batches
+    print("✅ batcher groups concurrent clips by language")
+
+def test_whisper_failure_falls_back_to_google():
+    """A Whisper error is answered by Google; Google is used directly without Whisper"""
+    service = SpeechToTextService()
+    calls = []
+    
+    async def failing_whisper(audio_bytes, language):
+        calls.append("whisper")
+        raise Exception("whisper failed")
+        
+    async def google(audio_bytes, language):
+        calls.append("google")
+        return {"text": "hello", "confidence": 0.8, "language": language, "segments": []}
+        
+    service.transcribe_audio_whisper_bytes = failing_whisper
+    service.transcribe_audio_google_bytes = google
+    
+    previous_model = SpeechToTextService._shared_model
+    try:
+        SpeechToTextService._shared_model = object()  # Stand-in loaded model
+        service.whisper_available = True
+        result = asyncio.run(service._transcribe_bytes(b"audio", "en", "whisper"))
+        assert result["text"] == "hello" and calls == ["whisper", "google"], calls
+        
+        calls.clear()
+        service.whisper_available = False
+        result = asyncio.run(service._transcribe_bytes(b"audio", "en", "whisper"))
+        assert result["text"] == "hello" and calls == ["google"], calls
+    finally:
+        SpeechToTextService._shared_model = previous_model
+        
+    print("✅ Whisper -> Google fallback chain preserved")
+
+if __name__ == "__main__":
+    test_decode_base64_padding()
+    test_batcher_groups_concurrent_clips()
+    test_whisper_failure_falls_back_to_google()
@@ -4,6 +4,24 @@ Test subtlety detection - dark room and house cold scenarios
 """
 import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
+
+# One keep-alive connection pool for all test requests
+session = requests.Session()
+
+def post_case(message):
+    """Send one test message, returning the response or the exception raised"""
+    try:
+        return session.post(
+            "http://localhost:8000/eldercare/text-assistance",
+            json={
+                "message": message,
+                "elder_info": {"name": "Test User", "age": 75}
+            },
+            timeout=20
+        )
+    except Exception as e:
+        return e
 
 def test_subtlety_detection():
     """Test enhanced subtlety detection via API"""
@@ -25,18 +43,17 @@ def test_subtlety_detection():
     print("Testing Enhanced Subtlety Detection")
     print("=" * 40)
     
-    for message in test_cases:
+    # Send every case at once over one pooled session; results print in order
+    with ThreadPoolExecutor(max_workers=len(test_cases)) as pool:
+        outcomes = list(pool.map(post_case, test_cases))
+    
+    for message, outcome in zip(test_cases, outcomes):
         print(f"\nTesting: '{message}'")
         
         try:
-            response = requests.post(
-                "http://localhost:8000/eldercare/text-assistance",
-                json={
-                    "message": message,
-                    "elder_info": {"name": "Test User", "age": 75}
-                },
-                timeout=20
-            )
+            if isinstance(outcome, Exception):
+                raise outcome
+            response = outcome
             
             if response.status_code == 200:
                 data = response.json()
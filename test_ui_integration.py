@@ -5,6 +5,9 @@ Test the complete UI integration - both errors should now be fixed
 import requests
 import json
 
+# One keep-alive connection for all test requests
+session = requests.Session()
+
 def test_ui_integration():
     """Test that the UI backend integration works correctly"""
     
@@ -13,7 +16,7 @@ def test_ui_integration():
     # Test 1: MQTT endpoint (should work now)
     try:
         print("\n1. Testing MQTT command (Living Room Light ON)")
-        response = requests.post(
+        response = session.post(
             "http://localhost:8000/mqtt/send",
             json={
                 "topic": "home/living_room/lights/cmd",
@@ -44,7 +47,7 @@ def test_ui_integration():
     print("\n2. Testing all room light controls")
     for room, command in rooms_and_commands:
         try:
-            response = requests.post(
+            response = session.post(
                 "http://localhost:8000/mqtt/send",
                 json={
                     "topic": f"home/{room}/lights/cmd",
@@ -63,7 +66,7 @@ def test_ui_integration():
     # Test 3: Thermostat command
     try:
         print("\n3. Testing thermostat control")
-        response = requests.post(
+        response = session.post(
             "http://localhost:8000/mqtt/send",
             json={
                 "topic": "home/room/data", 